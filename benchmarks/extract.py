@@ -0,0 +1,87 @@
+"""HTML extraction benchmark: python benchmarks/extract.py [iterations]
+
+Compares the BeautifulSoup find/find_all code WallsCloud used to run against
+parsers.extract on the saved pages in benchmarks/fixtures, reporting CPU time
+and peak allocated memory per page as JSON.
+"""
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup
+
+from parsers.extract import extract_quantity, extract_wall_links, extract_resolutions
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def soup_search(html: str) -> tuple:
+    soup = BeautifulSoup(html, "html.parser")
+    pictures = int(soup.find("div", class_="page-title").find("small").text.split()[0])
+    images = []
+    block = soup.find("div", class_="grid-row walls_data")
+    if block.find("figure"):
+        for j in block.find_all("a", class_="wall_link"):
+            images.append(j["href"])
+    return pictures, images
+
+
+def soup_resolutions(html: str) -> list:
+    soup = BeautifulSoup(html, "html.parser")
+    block = soup.find("div", class_="resblocks")
+    return [list(map(int, i.text.split(" x "))) for i in block.find_all("a", recursive=True)]
+
+
+def extract_search(html: str) -> tuple:
+    return extract_quantity(html), extract_wall_links(html)
+
+
+CASES = {
+    "search.html": (soup_search, extract_search),
+    "search_empty.html": (soup_search, extract_search),
+    "detail.html": (soup_resolutions, extract_resolutions),
+}
+
+
+def measure(func, html: str, iterations: int) -> dict:
+    started = time.process_time()
+    for _ in range(iterations):
+        func(html)
+    cpu = (time.process_time() - started) / iterations
+
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"cpu_ms": cpu * 1000, "peak_kib": peak / 1024}
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    report = {"iterations": iterations, "pages": {}}
+
+    for name, (baseline, targeted) in CASES.items():
+        html = (FIXTURES / name).read_text(encoding="utf-8")
+        if baseline(html) != targeted(html):
+            raise AssertionError(f"{name}: extraction differs from the BeautifulSoup result")
+
+        old = measure(baseline, html, iterations)
+        new = measure(targeted, html, iterations)
+        report["pages"][name] = {
+            "bytes": len(html.encode()),
+            "soup": old,
+            "extract": new,
+            "cpu_speedup": old["cpu_ms"] / new["cpu_ms"],
+            "memory_ratio": old["peak_kib"] / new["peak_kib"],
+        }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""End-to-end rotation benchmark: python benchmarks/rotation.py [--ticks 20] [--latency 0.05] ...
+
+Runs the WallsCloud -> link pool -> resolution probe -> download pipeline against
+benchmarks/standin_server.py with the OS wallpaper call stubbed out, and prints
+tick-to-wallpaper latency, request counts, bytes transferred and peak RSS as JSON.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.standin_server import arguments
+from parsers.wallscloud_parser import WallsCloud
+from scripts.library import WallpaperLibrary
+from scripts.link_pool import LinkPool
+from scripts.metrics import METRICS
+from scripts.rotation import find_in_pool, download_image, MATCH_MODES
+
+
+def peak_rss_mib():
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def start_server(args) -> tuple:
+    command = [sys.executable, str(ROOT / "benchmarks" / "standin_server.py"), "--port", "0",
+               "--results", str(args.results), "--latency", str(args.latency), "--bandwidth", str(args.bandwidth),
+               "--failure-rate", str(args.failure_rate), "--drop-rate", str(args.drop_rate),
+               "--match-rate", str(args.match_rate),
+               "--target", *map(str, args.target)]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    return server, server.stdout.readline().strip()
+
+
+def summary(samples: list) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def run(args) -> dict:
+    server, search_url = start_server(args)
+    stats_url = search_url.replace("/ru/search", "/__stats")
+
+    try:
+        directory = tempfile.mkdtemp(prefix="wallpaster-bench-")
+        parser_class = type("StandInWallsCloud", (WallsCloud,),
+                            {"url": search_url, "cache_path": os.path.join(directory, "search_cache.json")})
+        library = WallpaperLibrary(directory)
+        query = {"q": "", "page": 1, "orientation": "landscape"}
+
+        parser = parser_class()
+        started = time.perf_counter()
+        pool = LinkPool(parser, query)
+        pool.fill()
+        search = time.perf_counter() - started
+
+        ticks, failures = [], 0
+        for _ in range(args.ticks):
+            started = time.perf_counter()
+            link, source = find_in_pool(pool, args.target, parser.get_available_resolutions, args.mode)
+            if link is None:
+                failures += 1
+                continue
+            try:
+                path = download_image(parser, link, args.target, directory, library, source)
+            except Exception as e:
+                print("DOWNLOAD FAILED: ", e, file=sys.stderr)
+                failures += 1
+                continue
+            library.touch(path)  # stands in for set_wallpaper
+            ticks.append(time.perf_counter() - started)
+
+        stats = requests.get(stats_url).json()
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "search_ms": search * 1000,
+        "tick": summary(ticks),
+        "failed_ticks": failures,
+        "requests": {kind: entry["requests"] for kind, entry in stats.items()},
+        "bytes": {kind: entry["bytes"] for kind, entry in stats.items()},
+        "requests_per_tick": sum(entry["requests"] for entry in stats.values()) / max(args.ticks, 1),
+        "peak_rss_mib": peak_rss_mib(),
+        "stages": {stage: {key: data[key] for key in ["count", "p50", "p95", "max"]}
+                   for stage, data in METRICS.snapshot()["stages"].items()},
+        "client_counters": METRICS.snapshot()["counters"],
+        "client_gauges": METRICS.snapshot()["gauges"],
+        "files_on_disk": len([i for i in os.listdir(directory) if not i.endswith(".json")]),
+    }
+
+
+def main():
+    parser = arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--mode", choices=MATCH_MODES, default="exact", help="resolution matching mode")
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    # keep the pipeline's progress prints, including late ones from background refills, out of the report
+    sys.stdout = sys.stderr
+    report = json.dumps(run(args), indent=2)
+    print(report, file=sys.__stdout__)
+    if args.output:
+        Path(args.output).write_text(report)
+
+
+if __name__ == "__main__":
+    main()
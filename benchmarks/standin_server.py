@@ -0,0 +1,207 @@
+"""Local WallsCloud stand-in: python benchmarks/standin_server.py [--port 8000] [--latency 0.05] ...
+
+Serves the recorded pages in benchmarks/fixtures with links rewritten to point at
+itself, plus generated image files. Latency, bandwidth and failure rate are
+configurable, image downloads honour Range requests and can be cut off midway
+to exercise resuming, and GET /__stats returns request and byte counters as JSON
+(GET /__reset clears them).
+"""
+import argparse
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+PER_PAGE = 35
+WALL_LINK = re.compile(r'href="https://wallscloud\.net/ru/wallpaper/[^"]+" class="wall_link"')
+RES_BLOCK = re.compile(r'<div class="resblocks">.*?\n        </div>\n', re.S)
+DOWNLOAD = re.compile(r"^/ru/wallpaper/([^/]+)/([^/]+)/+(\d+)x(\d+)/download$")
+DETAIL = re.compile(r"^/ru/wallpaper/([^/]+)/([^/]+)/?$")
+RESOLUTIONS = [[1280, 720], [1366, 768], [1600, 900], [1920, 1080], [2560, 1440], [3840, 2160]]
+
+
+def make_image(size: list, quality: int = 90) -> bytes:
+    from PIL import Image
+
+    noise = Image.effect_noise((size[0] // 4, size[1] // 4), 64).resize(size).convert("RGB")
+    buffer = io.BytesIO()
+    noise.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class StandIn:
+    def __init__(self, results: int = 35 * 20, latency: float = 0.0, bandwidth: float = 0.0,
+                 failure_rate: float = 0.0, match_rate: float = 0.3, target: list = None, image_size: list = None,
+                 drop_rate: float = 0.0):
+        self.results = results
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self.match_rate = match_rate
+        self.target = target or [1920, 1080]
+        self.search_template = (FIXTURES / "search.html").read_text(encoding="utf-8")
+        self.empty_template = (FIXTURES / "search_empty.html").read_text(encoding="utf-8")
+        self.detail_template = (FIXTURES / "detail.html").read_text(encoding="utf-8")
+        self.image = make_image(image_size or self.target)
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def count(self, kind: str, sent: int) -> None:
+        with self.lock:
+            entry = self.stats.setdefault(kind, {"requests": 0, "bytes": 0})
+            entry["requests"] += 1
+            entry["bytes"] += sent
+
+    def search_page(self, base: str, query: dict) -> str:
+        page = int(query.get("page", ["1"])[0])
+        first = (page - 1) * PER_PAGE
+        on_page = max(0, min(PER_PAGE, self.results - first))
+        if not on_page:
+            return self.empty_template.replace("<small>0 ", f"<small>{self.results} ")
+
+        topic = query.get("q", [""])[0] or "all"
+        links = iter(f'href="{base}/ru/wallpaper/{topic}/wall-{first + i}/" class="wall_link"' for i in range(on_page))
+        html = WALL_LINK.sub(lambda _: next(links, 'href="#" class="wall_link_missing"'), self.search_template)
+        return html.replace("<small>48213 ", f"<small>{self.results} ")
+
+    def detail_page(self, base: str, slug: str) -> str:
+        digest = int(hashlib.md5(slug.encode()).hexdigest(), 16)
+        resolutions = [i for i in RESOLUTIONS if i != self.target]
+        if digest % 1000 < self.match_rate * 1000:
+            resolutions.append(self.target)
+
+        links = "\n".join(f'            <a href="{base}/ru/wallpaper/x/{slug}/{w}x{h}">{w} x {h}</a>'
+                          for w, h in resolutions)
+        return RES_BLOCK.sub(f'<div class="resblocks">\n{links}\n        </div>\n', self.detail_template)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    standin: StandIn = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        standin = self.standin
+        url = urlsplit(self.path)
+        base = f"http://{self.headers['Host']}"
+
+        if url.path == "/__stats":
+            with standin.lock:
+                return self.reply(json.dumps(standin.stats).encode(), "application/json", None)
+        if url.path == "/__reset":
+            with standin.lock:
+                standin.stats = {}
+            return self.reply(b"{}", "application/json", None)
+
+        if standin.latency:
+            time.sleep(standin.latency)
+
+        if random.random() < standin.failure_rate:
+            return self.reply(b"unavailable", "text/plain", "failure", status=503)
+
+        if url.path == "/ru/search":
+            body = standin.search_page(base, parse_qs(url.query, keep_blank_values=True)).encode()
+            return self.reply(body, "text/html; charset=utf-8", "search")
+
+        match = DOWNLOAD.match(url.path)
+        if match:
+            # bytes after the end-of-image marker keep the JPEG valid but give every wallpaper its own hash
+            return self.reply_range(standin.image + match.group(2).encode(), "image/jpeg", "image")
+
+        match = DETAIL.match(url.path)
+        if match:
+            return self.reply(standin.detail_page(base, match.group(2)).encode(), "text/html; charset=utf-8", "detail")
+
+        self.reply(b"not found", "text/plain", "missing", status=404)
+
+    def reply_range(self, body: bytes, content_type: str, kind) -> None:
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if not match or self.headers.get("If-Range", etag) != etag:
+            return self.reply(body, content_type, kind, headers={"Accept-Ranges": "bytes", "ETag": etag})
+
+        start = int(match.group(1))
+        end = min(int(match.group(2) or len(body) - 1), len(body) - 1)
+        if start > end:
+            return self.reply(b"", content_type, None, status=416, headers={"Content-Range": f"bytes */{len(body)}"})
+        self.reply(body[start:end + 1], content_type, kind, status=206,
+                   headers={"Accept-Ranges": "bytes", "ETag": etag, "Content-Range": f"bytes {start}-{end}/{len(body)}"})
+
+    def reply(self, body: bytes, content_type: str, kind, status: int = 200, headers: dict = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        # a dropped body stops halfway and closes the connection, as a flaky network would
+        dropped = kind == "image" and random.random() < self.standin.drop_rate
+        length = len(body) // 2 if dropped else len(body)
+
+        chunk = 64 * 1024
+        for start in range(0, length, chunk):
+            part = body[start:min(start + chunk, length)]
+            self.wfile.write(part)
+            if self.standin.bandwidth and kind:
+                time.sleep(len(part) / self.standin.bandwidth)
+
+        if dropped:
+            self.close_connection = True
+            self.standin.count("dropped", length)
+            return
+
+        if kind:
+            self.standin.count(kind, len(body))
+
+
+def serve(standin: StandIn, port: int = 0) -> ThreadingHTTPServer:
+    """Starts the stand-in on a daemon thread and returns the server, its port is server.server_port"""
+    handler = type("StandInHandler", (Handler,), {"standin": standin})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def arguments(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    parser.add_argument("--results", type=int, default=35 * 20, help="number of search results")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="bytes per second, 0 for unlimited")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="share of image bodies cut off halfway")
+    parser.add_argument("--match-rate", type=float, default=0.3, help="share of wallpapers offering the target")
+    parser.add_argument("--target", type=int, nargs=2, default=[1920, 1080], help="target resolution")
+    return parser
+
+
+def from_arguments(args) -> StandIn:
+    return StandIn(args.results, args.latency, args.bandwidth, args.failure_rate, args.match_rate, args.target,
+                   drop_rate=args.drop_rate)
+
+
+def main():
+    parser = arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = serve(from_arguments(args), args.port)
+    print(f"http://127.0.0.1:{server.server_port}/ru/search", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
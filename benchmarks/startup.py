@@ -0,0 +1,68 @@
+"""Startup timing harness: python benchmarks/startup.py [runs]
+
+Launches main.py until its first paint and prints machine-readable timings:
+in-process import time, time to first paint and the slowest imports.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ["requests", "bs4", "PIL"]
+
+
+def launch(importtime: bool = False) -> tuple:
+    env = dict(os.environ, WALLPASTER_STARTUP_TIMING="exit")
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["main.py"]
+
+    started = time.perf_counter()
+    proc = subprocess.run(args, cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    wall = time.perf_counter() - started
+
+    timings = next((json.loads(line) for line in proc.stdout.splitlines() if line.startswith("{")), None)
+    if timings is None:
+        raise RuntimeError(f"main.py did not report its startup:\n{proc.stderr}")
+
+    timings["process"] = wall
+    return timings, proc.stderr
+
+
+def parse_importtime(stderr: str) -> list:
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative), name.rstrip()))
+    return modules
+
+
+def slowest_imports(modules: list, count: int = 10) -> list:
+    top = [(us, name.strip()) for us, name in modules if not name.startswith("  ")]
+    return [{"module": name, "cumulative_us": us} for us, name in sorted(top, reverse=True)[:count]]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    samples = [launch()[0] for _ in range(runs)]
+    _, stderr = launch(importtime=True)
+    modules = parse_importtime(stderr)
+    loaded = {name.strip() for _, name in modules}
+
+    report = {
+        "runs": runs,
+        **{key: statistics.median(sample[key] for sample in samples) for key in ["import", "first_paint", "process"]},
+        "slowest_imports": slowest_imports(modules),
+        # modules that should only be imported after the first paint
+        "heavy_modules_before_paint": [name for name in HEAVY_MODULES if name in loaded],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Rotates wallpapers without the window: python headless.py [--once] [--setter noop] [--command "feh --bg-fill"]
+
+Never imports PyQt6. Uses the same save.json, parsers, link pool and wallpaper library as the
+window, so both can share one image directory. Also reachable as python main.py --headless.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from pathlib import Path
+
+from parsers.local_folder import LocalFolder
+from parsers.registry import discover
+from scripts import imaging
+from scripts.catalog import Catalog
+from scripts.image_stats import RULES, colour_value
+from scripts.library import WallpaperLibrary
+from scripts.link_pool import LinkPool
+from scripts.metrics import METRICS
+from scripts.rotation import MATCH_MODES, select_link, download_image
+from scripts.settings import Settings, default_settings
+from scripts.support import import_object
+from scripts.wallpaper_setter import SETTERS, make_setter
+
+ROOT = Path(__file__).resolve().parent
+DEFAULT_RESOLUTION = [1920, 1080]
+
+
+class Daemon:
+    """Slideshow loop of the window without Qt: search once, then probe, download and set every interval
+
+    With a brightness rule or colour theme it keeps prefetch_depth downloads at hand, as the
+    window's prefetcher does, and sets the one that suits the rule best.
+    """
+    def __init__(self, parser, query: dict, settings: Settings, setter, interval: float = None,
+                 resolution: list = None, directory: str = None, mode: str = None, screens: list = None,
+                 rule: str = None, colour: str = None):
+        self.parser = parser
+        self.query = query
+        self.settings = settings
+        self.setter = setter
+        self.interval = interval or settings["interval"] / 1000
+        self.resolution = resolution or settings["resolution"]
+        self.directory = directory or settings["dir"]
+        self.mode = mode or settings["match_mode"]
+        self.screens = screens
+        self.rule = rule or settings["brightness"]
+        self.colour = settings["colour"] if colour is None else colour
+        self.library = WallpaperLibrary(self.directory, settings["library_max_bytes"], settings["library_max_count"])
+        self.catalog = Catalog(self.directory)
+        self.depth = 1 if self.rule == "any" and not self.colour else max(1, settings["prefetch_depth"])
+        self.candidates = []
+        self.pool = None
+        self.stopped = threading.Event()
+
+    def search(self) -> None:
+        with METRICS.span("search"):
+            pool = LinkPool(self.parser, self.query, catalog=self.catalog)
+            pool.fill()
+        print("Link pool: ", len(pool))
+        self.pool = pool
+
+    def tick(self):
+        """Sets one wallpaper and returns its path, or None when nothing could be set"""
+        try:
+            if self.pool is None:
+                self.search()
+
+            path = self.next_image()
+            if path is None:
+                print("IMAGES WERE NOT FOUND")
+                return None
+        except Exception as e:
+            print("SOURCE IS UNAVAILABLE: ", e)
+            size = imaging.output_size(self.resolution, self.screens)
+            path = self.catalog.offline(size, self.rule, self.colour) or self.library.random_file()
+            if path is None:
+                return None
+            print("Offline image: ", path)
+            METRICS.incr("offline_rotations")
+
+        self.set_wallpaper(path)
+        return path
+
+    def next_image(self):
+        """Tops the downloaded candidates up to depth and takes the best one for the rule"""
+        self.candidates = [path for path in self.candidates if os.path.exists(path)]
+        while len(self.candidates) < self.depth:
+            try:
+                link, source = select_link(self.pool, self.resolution, self.parser, self.mode, catalog=self.catalog)
+                if link is None:
+                    break
+                print("Image: ", link)
+                path = download_image(self.parser, link, self.resolution, self.directory, self.library, source,
+                                      self.catalog, screens=self.screens)
+            except Exception:
+                if not self.candidates:
+                    raise
+                break  # rotate through what is already downloaded
+            if path not in self.candidates:
+                self.candidates.append(path)
+
+        path = self.catalog.choose(self.candidates, self.rule, self.colour)
+        if path is not None:
+            self.candidates.remove(path)
+        return path
+
+    def index(self) -> None:
+        """Brings the statistics index up to date in the background, the first wallpaper does not wait for it"""
+        try:
+            print("Indexed images: ", self.catalog.refresh_stats())
+        except Exception as e:
+            print("INDEXING FAILED: ", e)
+
+    def set_wallpaper(self, path: str) -> None:
+        self.library.touch(path)
+        self.catalog.shown(path)
+        with METRICS.span("set_wallpaper"):
+            self.setter(path)
+        METRICS.incr("rotations")
+        METRICS.export()
+
+    def run(self, once: bool = False) -> None:
+        threading.Thread(target=self.index, daemon=True).start()
+        while not self.stopped.is_set():
+            self.tick()
+            if once:
+                break
+            self.stopped.wait(self.interval)
+
+        self.settings.flush()
+        self.catalog.close()
+        imaging.shutdown()
+        self.parser.client.close()
+
+    def stop(self, *args) -> None:
+        self.stopped.set()
+
+
+def arguments(parsers: dict) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--parser", choices=list(parsers), default=next(iter(parsers)))
+    parser.add_argument("--query", default="", help="search themes, empty for all images")
+    parser.add_argument("--orientation", choices=["landscape", "portrait"], default="landscape")
+    parser.add_argument("--interval", type=float, help="minutes between wallpapers, default from save.json")
+    parser.add_argument("--resolution", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--screen", type=int, nargs=4, action="append", metavar=("X", "Y", "WIDTH", "HEIGHT"),
+                        help="repeat once per monitor to fill each from the same image and span the result")
+    parser.add_argument("--directory", help="image directory, default from save.json")
+    parser.add_argument("--mode", choices=MATCH_MODES, help="resolution matching mode")
+    parser.add_argument("--local-folder", help="image tree of the Local folder source, default from save.json")
+    parser.add_argument("--brightness", choices=RULES, help="prefer dark or light wallpapers among the downloaded ones")
+    parser.add_argument("--colour", type=colour_value,
+                        help="prefer downloaded wallpapers with this dominant colour, e.g. #204080")
+    parser.add_argument("--setter", choices=SETTERS, help="wallpaper backend, windows on Windows and noop elsewhere")
+    parser.add_argument("--command", help='command that sets the wallpaper, "{path}" is replaced by the image')
+    parser.add_argument("--once", action="store_true", help="set one wallpaper and exit")
+    return parser
+
+
+def main(argv: list = None) -> int:
+    os.chdir(ROOT)
+    parsers = discover()
+    args = arguments(parsers).parse_args(argv)
+
+    settings = Settings(default_settings(os.path.join(ROOT, "images"), DEFAULT_RESOLUTION))
+    if args.local_folder or settings["local_folder"]:
+        LocalFolder.root = args.local_folder or settings["local_folder"]
+    daemon = Daemon(import_object(parsers[args.parser])(), {"q": args.query, "page": 1, "orientation": args.orientation},
+                    settings, make_setter(args.setter, args.command, span=len(args.screen or []) > 1),
+                    interval=args.interval and args.interval * 60, resolution=args.resolution,
+                    directory=args.directory, mode=args.mode, screens=args.screen, rule=args.brightness,
+                    colour=args.colour)
+
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    daemon.run(args.once)
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
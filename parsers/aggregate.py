@@ -0,0 +1,184 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from random import randint
+from urllib.parse import urlsplit
+
+from parsers.parser import Parser
+from scripts.metrics import METRICS
+from scripts.support import import_object
+
+
+class Source:
+    """One wrapped parser with its own concurrency limit and a running health score"""
+    def __init__(self, parser: Parser, limit: int = 4):
+        self.parser = parser
+        self.name = parser.name
+        self.semaphore = threading.Semaphore(limit)
+        self.latency = 1.0
+        self.success = 1.0
+        self._lock = threading.Lock()
+
+    def call(self, method: str, *args):
+        with self.semaphore:
+            started = time.perf_counter()
+            try:
+                result = getattr(self.parser, method)(*args)
+            except Exception:
+                self.record(time.perf_counter() - started, False)
+                raise
+            self.record(time.perf_counter() - started, True)
+            return result
+
+    def record(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.latency = 0.7 * self.latency + 0.3 * seconds
+            self.success = 0.8 * self.success + 0.2 * ok
+
+    @property
+    def healthy(self) -> bool:
+        return self.success >= 0.5
+
+    @property
+    def score(self) -> float:
+        return self.success / (self.latency + 0.1)
+
+
+class Aggregate(Parser):
+    """Queries the other parsers concurrently and merges their results
+
+    Link lists and counts are merged: every healthy source is asked at once and the call
+    waits up to hedge_delay for all of them. Single answers such as the page count come
+    from the best-ranked source. Either way the next source, unhealthy ones last, is asked
+    as a hedge when nothing has answered within hedge_delay or every source asked so far
+    failed. Late answers are merged into the next call.
+    """
+    url = ""
+    name = "All sources"
+    hedge_delay = 1.5
+    max_links = 10000
+
+    def __init__(self, parsers: list = None):
+        super().__init__()
+        if parsers is None:
+            from parsers.registry import discover
+            parsers = [import_object(path)() for name, path in discover().items() if name != self.name]
+
+        self.sources = [Source(parser) for parser in parsers]
+        self.executor = ThreadPoolExecutor(max_workers=4 * max(len(self.sources), 1))
+        self._owners = OrderedDict()
+        self._late = {}
+        self._lock = threading.Lock()
+
+    def ranked(self) -> list:
+        return sorted(self.sources, key=lambda x: x.score, reverse=True)
+
+    def owner(self, link: str) -> Source:
+        with self._lock:
+            source = self._owners.get(link)
+        if source is None:
+            # links remembered from an earlier session, e.g. in the catalog, belong to the source of their host
+            host = urlsplit(link).netloc
+            source = next((i for i in self.sources if urlsplit(i.parser.url).netloc == host), None)
+        if source is None:
+            raise KeyError(f"unknown link: {link}")
+        return source
+
+    def remember(self, source: Source, links: list) -> None:
+        with self._lock:
+            for link in links:
+                self._owners[link] = source
+                self._owners.move_to_end(link)
+            while len(self._owners) > self.max_links:
+                self._owners.popitem(last=False)
+
+    def fan_out(self, key: str, work, merge: bool = False) -> list:
+        """Runs work(source) for the sources and returns [(source, result)] as described in the class docstring"""
+        ranked = self.ranked()
+        queue = [i for i in ranked if i.healthy] + [i for i in ranked if not i.healthy]
+        first = ([i for i in queue if i.healthy] or queue[:1]) if merge else queue[:1]
+        queue = queue[len(first):]
+
+        futures = {self.executor.submit(work, source): source for source in first}
+        deadline = time.monotonic() + self.hedge_delay
+        results = []
+
+        while futures or queue:
+            answered = any(result for _, result in results)
+            now = time.monotonic()
+            if answered and (not merge or not futures or now >= deadline):
+                break
+
+            if not answered and queue and (not futures or now >= deadline):
+                if futures:
+                    METRICS.incr("hedged_requests")
+                source = queue.pop(0)
+                futures[self.executor.submit(work, source)] = source
+                deadline = now + self.hedge_delay
+
+            timed = answered or queue
+            done, _ = wait(futures, timeout=max(0.0, deadline - time.monotonic()) if timed else None,
+                           return_when=FIRST_COMPLETED)
+
+            for future in done:
+                source = futures.pop(future)
+                try:
+                    results.append((source, future.result()))
+                except Exception as e:
+                    print("SOURCE FAILED: ", source.name, e)
+
+        for future, source in futures.items():
+            future.add_done_callback(lambda f, s=source: self.keep_late(key, s, f))
+
+        answered = {source for source, _ in results}
+        return results + [(source, result) for source, result in self.take_late(key) if source not in answered]
+
+    def keep_late(self, key: str, source: Source, future) -> None:
+        if future.exception() is None and future.result():
+            with self._lock:
+                self._late.setdefault(key, []).append((source, future.result()))
+
+    def take_late(self, key: str) -> list:
+        with self._lock:
+            return self._late.pop(key, [])
+
+    def get_page_links(self, query: dict) -> list:
+        def work(source):
+            pages = max(source.call("get_pages", query), 1)
+            return source.call("get_page_links", {**query, "page": (query["page"] - 1) % pages + 1})
+
+        lists = []
+        for source, links in self.fan_out(f"links:{self.query_key(query)}", work, merge=True):
+            self.remember(source, links)
+            lists.append(links)
+
+        # interleave so every source is represented near the front of the pool
+        merged = []
+        for i in range(max(map(len, lists), default=0)):
+            merged.extend(links[i] for links in lists if i < len(links))
+        return merged
+
+    def get_image_links(self, query: dict) -> list:
+        query["page"] = randint(1, max(self.get_pages(query), 1))
+        return self.get_page_links(query)
+
+    def get_available_resolutions(self, link: str) -> list:
+        return self.owner(link).call("get_available_resolutions", link)
+
+    def get_image(self, link: str, resolution: list, stem: str, progress=None) -> str:
+        return self.owner(link).call("get_image", link, resolution, stem, progress)
+
+    def get_pages(self, query: dict) -> int:
+        results = self.fan_out(f"pages:{self.query_key(query)}", lambda source: source.call("get_pages", query))
+        return max([pages for _, pages in results] or [0])
+
+    def get_quantity(self, query: dict) -> int:
+        results = self.fan_out(f"quantity:{self.query_key(query)}", lambda source: source.call("get_quantity", query),
+                               merge=True)
+        return sum(quantity for _, quantity in results)
+
+    @staticmethod
+    def query_key(query: dict) -> str:
+        return f"{query.get('q', '')}:{query.get('orientation', '')}"
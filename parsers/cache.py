@@ -0,0 +1,107 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from scripts.metrics import METRICS
+
+
+class TTLCache:
+    """Query-keyed LRU cache whose entries expire after ttl seconds, persisted as json
+
+    Changes are written save_delay seconds after the first of them, in one go and off the
+    caller's thread, and once more when the interpreter exits.
+    """
+    def __init__(self, path: str = None, ttl: float = 6 * 60 * 60, max_entries: int = 256,
+                 save_delay: float = 2):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.save_delay = save_delay
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._timer = None
+        self.load()
+        if self.path:
+            atexit.register(self.flush)
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                METRICS.incr("cache_misses")
+                return default
+
+            stored, value = entry
+            if time.time() - stored > self.ttl:
+                del self._data[key]
+                METRICS.incr("cache_misses")
+                return default
+
+            self._data.move_to_end(key)
+            METRICS.incr("cache_hits")
+            return value
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        self.schedule_save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+        self.schedule_save()
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, stored, value in items:
+                if now - stored <= self.ttl:
+                    self._data[key] = (stored, value)
+
+    def schedule_save(self) -> None:
+        if not self.path:
+            return
+
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Writes pending changes now"""
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is None:
+            return
+        timer.cancel()
+        self.save()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+
+        with self._lock:
+            items = [[key, stored, value] for key, (stored, value) in self._data.items()]
+        with self._save_lock:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(items, f)
+            os.replace(tmp, self.path)
@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from parsers.scheduler import SCHEDULER, RequestScheduler
+from scripts.metrics import METRICS
+
+DEFAULT_HEADERS = {
+    "User-Agent": "WallPaster",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+CHUNK_SIZE = 64 * 1024
+SIGNATURES = [
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+]
+CONTENT_TYPES = {
+    "image/jpeg": "jpeg",
+    "image/jpg": "jpeg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/bmp": "bmp",
+}
+
+
+def sniff_extension(head: bytes, content_type: str = None) -> str:
+    """Detects the image format from its first bytes, falling back to the Content-Type header"""
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+
+    if content_type:
+        return CONTENT_TYPES.get(content_type.split(";")[0].strip().lower(), "jpeg")
+
+    return "jpeg"
+
+
+class HttpClient:
+    """Pooled keep-alive transport shared by all calls of one parser
+
+    Every request is admitted by the scheduler, which is shared by all parsers by default.
+    """
+    def __init__(self, pool_size: int = 8, timeout: tuple = (5, 30), max_validators: int = 64,
+                 scheduler: RequestScheduler = None):
+        self.timeout = timeout
+        self.scheduler = scheduler or SCHEDULER
+        self.max_validators = max_validators
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._validators = OrderedDict()
+        self.downloads = None
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: dict = None, revalidate: bool = False, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+
+        if not revalidate:
+            return self.count(self.send(url, params=params, **kwargs))
+
+        key = requests.Request("GET", url, params=params).prepare().url
+        with self._lock:
+            cached = self._validators.get(key)
+            if cached is not None:
+                self._validators.move_to_end(key)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if cached is not None:
+            if cached.headers.get("ETag"):
+                headers["If-None-Match"] = cached.headers["ETag"]
+            if cached.headers.get("Last-Modified"):
+                headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+
+        res = self.count(self.send(url, params=params, headers=headers, **kwargs))
+
+        if res.status_code == 304 and cached is not None:
+            METRICS.incr("http_not_modified")
+            return cached
+
+        if res.ok and ("ETag" in res.headers or "Last-Modified" in res.headers):
+            with self._lock:
+                self._validators[key] = res
+                self._validators.move_to_end(key)
+                while len(self._validators) > self.max_validators:
+                    self._validators.popitem(last=False)
+
+        return res
+
+    def send(self, url: str, **kwargs) -> requests.Response:
+        return self.scheduler.request(lambda: self.session.get(url, **kwargs), url)
+
+    @staticmethod
+    def count(res: requests.Response) -> requests.Response:
+        METRICS.incr("http_requests")
+        METRICS.incr("http_bytes", len(res.content))
+        return res
+
+    def download(self, url: str, stem: str, progress=None) -> str:
+        """Downloads url to stem.<format> through the resumable download manager of this client
+
+        progress(done, total) is called from the downloading thread, total is None if unknown.
+        """
+        with self._lock:
+            if self.downloads is None:
+                from parsers.download import DownloadManager
+                self.downloads = DownloadManager(self)
+        return self.downloads.download(url, stem, progress)
+
+    def close(self):
+        if self.downloads is not None:
+            self.downloads.close()
+        self.session.close()
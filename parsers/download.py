@@ -0,0 +1,241 @@
+import json
+import math
+import os
+import queue
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import requests
+
+from parsers.client import CHUNK_SIZE, sniff_extension
+from scripts.metrics import METRICS
+
+SAVE_EVERY = 1024 * 1024
+RETRYABLE = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+class IncompleteDownload(requests.RequestException):
+    """The body ended before the expected length or the retries ran out"""
+
+
+class Restart(Exception):
+    """The server ignored the range or the file changed, the partial download is worthless"""
+
+
+class DownloadManager:
+    """Bounded queue of resumable downloads
+
+    Bytes go to stem.part, with the progress of every range in stem.part.json, so a dropped
+    connection, a retry or even a restart of the app only fetches what is missing. Large files
+    are fetched as parallel ranges. The file is renamed to stem.<format> once its length checks out.
+    """
+    def __init__(self, client, workers: int = 2, queue_size: int = 8, parallel: int = 4,
+                 range_size: int = 2 * 1024 * 1024, retries: int = 5):
+        self.client = client
+        self.workers = workers
+        self.parallel = parallel
+        self.range_size = range_size
+        self.retries = retries
+        self._queue = queue.Queue(queue_size)
+        self._threads = []
+        self._ranges = ThreadPoolExecutor(max_workers=workers * parallel)
+        self._lock = threading.Lock()
+
+    def download(self, url: str, stem: str, progress=None) -> str:
+        """Queues a download, blocking while the queue is full, and returns the committed path
+
+        progress(done, total) is called from the downloading thread; total is None if unknown.
+        """
+        with self._lock:
+            if not self._threads:
+                for _ in range(self.workers):
+                    thread = threading.Thread(target=self.work, daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+        future = Future()
+        self._queue.put((url, stem, progress, future))
+        return future.result()
+
+    def work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+
+            url, stem, progress, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.fetch(url, stem, progress))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def fetch(self, url: str, stem: str, progress=None) -> str:
+        part = f"{stem}.part"
+        try:
+            return self.resume(url, stem, part, progress)
+        except Restart:
+            METRICS.incr("download_restarts")
+            self.discard(part)
+            return self.resume(url, stem, part, progress)
+
+    def resume(self, url: str, stem: str, part: str, progress=None) -> str:
+        state = self.load_state(part, url)
+        first = None
+
+        if state is None:
+            # the first range doubles as the probe: small files arrive whole, large ones reveal their size
+            first = self.request(url, {"Range": f"bytes=0-{self.range_size - 1}"})
+            _, end, total = content_range(first)
+            state = {"url": url, "total": total, "content_type": first.headers.get("Content-Type"),
+                     "validator": first.headers.get("ETag") or first.headers.get("Last-Modified"),
+                     "segments": [[0, end, 0]]}
+
+            if first.status_code == 206 and total and end + 1 < total:
+                rest = total - end - 1
+                count = max(1, min(self.parallel - 1, math.ceil(rest / self.range_size)))
+                bounds = [end + 1 + rest * i // count for i in range(count + 1)]
+                state["segments"] += [[bounds[i], bounds[i + 1] - 1, 0] for i in range(count)]
+
+            with open(part, "wb") as f:
+                if total:
+                    f.truncate(total)
+            self.save_state(part, state)
+
+        state["lock"] = threading.Lock()
+        state["reported"] = 0
+        pending = [i for i, (start, end, done) in enumerate(state["segments"]) if end is None or start + done <= end]
+
+        futures = [self._ranges.submit(self.segment, part, state, i, progress) for i in pending[1:]]
+        try:
+            if pending:
+                self.segment(part, state, pending[0], progress, first if pending[0] == 0 else None)
+        finally:
+            wait(futures)
+        for future in futures:
+            future.result()
+
+        return self.commit(stem, part, state)
+
+    def segment(self, part: str, state: dict, index: int, progress=None, res=None) -> None:
+        """Writes one byte range at its offset, resuming it after interruptions"""
+        start, end, done = state["segments"][index]
+        failures = 0
+
+        while True:
+            try:
+                if res is None:
+                    headers = {"Range": f"bytes={start + done}-{'' if end is None else end}"}
+                    if state["validator"]:
+                        headers["If-Range"] = state["validator"]
+                    res = self.request(state["url"], headers)
+                    if res.status_code != 206 and start + done > 0:
+                        raise Restart(f"{state['url']} answered {res.status_code} to a range request")
+
+                with res, open(part, "r+b") as f:
+                    f.seek(start + done)
+                    unsaved = 0
+                    for chunk in res.iter_content(CHUNK_SIZE):
+                        if end is not None:
+                            chunk = chunk[:end + 1 - start - done]
+                        f.write(chunk)
+                        done += len(chunk)
+                        unsaved += len(chunk)
+                        METRICS.incr("http_bytes", len(chunk))
+                        if unsaved >= SAVE_EVERY:
+                            f.flush()
+                            self.advance(part, state, index, done, progress)
+                            unsaved = 0
+
+                self.advance(part, state, index, done, progress)
+                if end is None or start + done > end:
+                    return
+                raise IncompleteDownload(f"{state['url']} ended at byte {start + done} of range {start}-{end}")
+            except RETRYABLE + (IncompleteDownload,) as e:
+                self.advance(part, state, index, done, progress)
+                failures += 1
+                if failures > self.retries:
+                    raise
+                print("DOWNLOAD INTERRUPTED: ", state["url"], e)
+                METRICS.incr("download_resumes")
+                self.client.scheduler.wait(failures - 1)
+            finally:
+                res = None
+
+    def request(self, url: str, headers: dict) -> requests.Response:
+        METRICS.incr("http_requests")
+        # byte ranges and the length check refer to the stored file, so the body must not be compressed
+        res = self.client.send(url, stream=True, timeout=self.client.timeout,
+                               headers={**headers, "Accept-Encoding": "identity"})
+        res.raise_for_status()
+        return res
+
+    def advance(self, part: str, state: dict, index: int, done: int, progress=None) -> None:
+        with state["lock"]:
+            state["segments"][index][2] = done
+            self.save_state(part, state)
+            received = sum(segment[2] for segment in state["segments"])
+            report = progress is not None and received - state["reported"] >= SAVE_EVERY // 4
+            if report:
+                state["reported"] = received
+        if report:
+            progress(received, state["total"])
+
+    def commit(self, stem: str, part: str, state: dict) -> str:
+        size = os.path.getsize(part)
+        received = sum(segment[2] for segment in state["segments"])
+        if state["total"] is not None and (size != state["total"] or received != state["total"]):
+            raise IncompleteDownload(f"{state['url']}: {received} of {state['total']} bytes, file has {size}")
+
+        with open(part, "rb") as f:
+            head = f.read(16)
+        path = f"{stem}.{sniff_extension(head, state['content_type'])}"
+        os.replace(part, path)
+        self.discard(part)
+        return path
+
+    @staticmethod
+    def load_state(part: str, url: str):
+        try:
+            with open(f"{part}.json") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if state.get("url") != url or not os.path.exists(part):
+            return None
+        return state
+
+    @staticmethod
+    def save_state(part: str, state: dict) -> None:
+        data = {key: value for key, value in state.items() if key not in ("lock", "reported")}
+        with open(f"{part}.json.tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(f"{part}.json.tmp", f"{part}.json")
+
+    @staticmethod
+    def discard(part: str) -> None:
+        for path in (part, f"{part}.json"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+        self._ranges.shutdown(wait=False, cancel_futures=True)
+
+
+def content_range(res: requests.Response) -> tuple:
+    """(first byte, last byte, full size) of a response, the size is None if the server does not say
+
+    A 200 response is the whole file, its last byte is only known together with the size.
+    """
+    match = re.match(r"bytes (\d+)-(\d+)/(\d+|\*)", res.headers.get("Content-Range", ""))
+    if res.status_code == 206 and match:
+        start, end, total = match.groups()
+        return int(start), int(end), None if total == "*" else int(total)
+
+    total = int(res.headers["Content-Length"]) if res.headers.get("Content-Length") else None
+    return 0, total - 1 if total else None, total
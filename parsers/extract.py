@@ -0,0 +1,79 @@
+"""Targeted extraction of the few values the parsers need from a page.
+
+Instead of building a full tree, each function locates one element by its class,
+cuts out its markup by counting the nested tags and reads only the anchors inside.
+"""
+import re
+from html import unescape
+
+TAG = re.compile(r"<(/?)(\w+)\b[^>]*>")
+ANCHOR = re.compile(r"<a\b([^>]*)>(.*?)</a\s*>", re.S | re.I)
+ATTRIBUTE = re.compile(r"""([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+MARKUP = re.compile(r"<[^>]*>")
+RESOLUTION = re.compile(r"(\d+)\s*x\s*(\d+)")
+SMALL = re.compile(r"<small\b[^>]*>(.*?)</small\s*>", re.S | re.I)
+
+
+def element(html: str, tag: str, class_name: str, exact: bool = False, start: int = 0):
+    """Returns the markup of the first <tag> with the class or None, stopping right after its closing tag"""
+    if exact:
+        classes = re.escape(class_name)
+    else:
+        classes = rf"[^\"']*(?<![\w-]){re.escape(class_name)}(?![\w-])[^\"']*"
+    opening = re.compile(rf"""<{tag}\b[^>]*\bclass\s*=\s*["']{classes}["'][^>]*>""", re.I)
+
+    match = opening.search(html, start)
+    if match is None:
+        return None
+
+    depth = 1
+    for token in TAG.finditer(html, match.end()):
+        if token.group(2).lower() != tag:
+            continue
+        depth += -1 if token.group(1) else 1
+        if depth == 0:
+            return html[match.start():token.end()]
+
+    return html[match.start():]
+
+
+def attributes(markup: str) -> dict:
+    return {name.lower(): unescape(next(i for i in values if i is not None))
+            for name, *values in ATTRIBUTE.findall(markup)}
+
+
+def anchors(markup: str):
+    for attrs, text in ANCHOR.findall(markup):
+        yield attributes(attrs), unescape(MARKUP.sub("", text))
+
+
+def extract_quantity(html: str) -> int:
+    title = element(html, "div", "page-title")
+    small = SMALL.search(title) if title else None
+    if small is None:
+        raise ValueError("result count was not found on the page")
+
+    return int(unescape(MARKUP.sub("", small.group(1))).split()[0])
+
+
+def extract_wall_links(html: str) -> list:
+    block = element(html, "div", "grid-row walls_data", exact=True)
+    if block is None or "<figure" not in block:
+        return []
+
+    return [attrs["href"] for attrs, _ in anchors(block)
+            if "wall_link" in attrs.get("class", "").split() and "href" in attrs]
+
+
+def extract_resolutions(html: str) -> list:
+    block = element(html, "div", "resblocks")
+    if block is None:
+        return []
+
+    resolutions = []
+    for _, text in anchors(block):
+        match = RESOLUTION.search(text)
+        if match:
+            resolutions.append([int(match.group(1)), int(match.group(2))])
+
+    return resolutions
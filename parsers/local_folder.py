@@ -0,0 +1,212 @@
+from parsers.parser import Parser
+from scripts.metrics import METRICS
+from scripts.support import data_path
+from collections import deque
+from pathlib import Path
+from random import randint
+from urllib.parse import unquote, urlsplit
+import math
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp"}
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    orientation TEXT
+);
+CREATE INDEX IF NOT EXISTS files_orientation ON files (root, orientation, path);
+CREATE INDEX IF NOT EXISTS files_size ON files (root, width, height);
+"""
+
+
+def read_size(path: str):
+    """Width and height from the file header, with EXIF rotation applied, or None if it is no image"""
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            if img.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+                width, height = height, width
+    except Exception:
+        return None
+    return width, height
+
+
+class LocalFolder(Parser):
+    """Images of a directory tree, served from an index that a rescan only updates for changed files
+
+    The tree is the "local_folder" setting, the WALLPASTER_LOCAL_FOLDER variable or ~/Pictures.
+    """
+    url = ""
+    name = "Local folder"
+    per_page = 35
+    root = os.environ.get("WALLPASTER_LOCAL_FOLDER") or str(Path.home() / "Pictures")
+    index_path = None  # local_index.sqlite3 in the per-user data directory
+    rescan_interval = 60
+    recent_size = 256
+
+    def __init__(self, root: str = None):
+        super().__init__()
+        self.root = os.path.abspath(root or self.root)
+        self.scanned = 0.0
+        self.recent = deque(maxlen=self.recent_size)
+        self._db = sqlite3.connect(self.index_path or data_path("local_index.sqlite3"), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+
+    def scan(self, force: bool = False) -> None:
+        """Stats the tree and reads headers only of files that are new or whose mtime or size changed"""
+        with self._scan_lock:
+            if force or time.monotonic() - self.scanned >= self.rescan_interval:
+                self.rescan()
+
+    def rescan(self) -> None:
+        with METRICS.span("local_scan"):
+            with self._lock:
+                known = {path: (mtime, size) for path, mtime, size in
+                         self._db.execute("SELECT path, mtime, size FROM files WHERE root = ?", (self.root,))}
+
+            changed = []
+            for path, mtime, size in self.walk(self.root):
+                if known.pop(path, None) != (mtime, size):
+                    changed.append((path, mtime, size))
+
+            rows = []
+            for path, mtime, size in changed:
+                dimensions = read_size(path)
+                if dimensions is not None:
+                    width, height = dimensions
+                    rows.append((path, self.root, os.path.basename(path).lower(), mtime, size, width, height,
+                                 "portrait" if height > width else "landscape"))
+
+            with self._lock, self._db:
+                self._db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in known])
+                self._db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        self.scanned = time.monotonic()
+        print("Local folder: ", len(changed), "changed,", len(known), "removed")
+
+    @staticmethod
+    def walk(root: str) -> list:
+        """(path, mtime, size) of every image below root; scandir() makes the stat free on Windows"""
+        found = []
+        directories = [root]
+        while directories:
+            directory = directories.pop()
+            try:
+                entries = os.scandir(directory)
+            except OSError as e:
+                print("FOLDER UNREADABLE: ", directory, e)
+                continue
+
+            with entries:
+                for entry in entries:
+                    name = entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.path)
+                    elif name[name.rfind("."):].lower() in EXTENSIONS:
+                        try:
+                            stat = entry.stat()
+                        except OSError as e:
+                            print("FILE UNREADABLE: ", entry.path, e)  # a dangling link or deleted meanwhile
+                            continue
+                        found.append((entry.path, stat.st_mtime, stat.st_size))
+        return found
+
+    def select(self, query: dict, columns: str, suffix: str = "", params: tuple = ()) -> list:
+        self.scan()
+        where = "root = ?"
+        args = [self.root]
+        if query.get("orientation"):
+            where += " AND orientation = ?"
+            args.append(query["orientation"])
+        if query.get("q"):
+            where += " AND name LIKE ?"
+            args.append(f"%{query['q'].lower()}%")
+
+        with self._lock:
+            return self._db.execute(f"SELECT {columns} FROM files WHERE {where} {suffix}", (*args, *params)).fetchall()
+
+    def get_available_resolutions(self, link: str) -> list:
+        with self._lock:
+            row = self._db.execute("SELECT width, height FROM files WHERE path = ?", (self.link_path(link),)).fetchone()
+        return [list(row)] if row else []
+
+    def get_image(self, link: str, resolution: list, stem: str, progress=None) -> str:
+        """Copies the file, since the wallpaper library may evict what it holds"""
+        source = self.link_path(link)
+        extension = os.path.splitext(source)[1].lower()
+        path = stem if stem.lower().endswith(extension) else f"{stem}{extension}"
+        shutil.copyfile(source, f"{path}.part")
+        os.replace(f"{path}.part", path)
+        if progress is not None:
+            size = os.path.getsize(path)
+            progress(size, size)
+        return path
+
+    def get_image_links(self, query: dict) -> list:
+        query["page"] = randint(1, max(self.get_pages(query), 1))
+        return self.get_page_links(query)
+
+    def get_page_links(self, query: dict) -> list:
+        rows = self.select(query, "path", "ORDER BY path LIMIT ? OFFSET ?",
+                           (self.per_page, (query.get("page", 1) - 1) * self.per_page))
+        return [self.path_link(path) for path, in rows]
+
+    def get_pages(self, query: dict) -> int:
+        return math.ceil(self.get_quantity(query) / self.per_page)
+
+    def get_quantity(self, query: dict) -> int:
+        return self.select(query, "count(*)")[0][0]
+
+    def find_link(self, query: dict, resolution: list, mode: str = "exact") -> tuple:
+        """Picks a matching file straight from the size index, skipping the recently picked ones"""
+        row = self.find_row(query, resolution, mode, list(self.recent))
+        if row is None and self.recent:
+            # every match was picked lately, start the round over
+            self.recent.clear()
+            row = self.find_row(query, resolution, mode, [])
+        if row is None:
+            return None, None
+
+        path, width, height = row
+        self.recent.append(path)
+        return self.path_link(path), [width, height]
+
+    def find_row(self, query: dict, resolution: list, mode: str, exclude: list):
+        width, height = resolution
+        skip = f"AND path NOT IN ({', '.join('?' * len(exclude))})" if exclude else ""
+        rows = self.select(query, "path, width, height",
+                           f"AND width = ? AND height = ? {skip} ORDER BY random() LIMIT 1", (width, height, *exclude))
+        if not rows and mode == "nearest":
+            rows = self.select(query, "path, width, height",
+                               f"AND width >= ? AND height >= ? {skip} ORDER BY width * height, random() LIMIT 1",
+                               (width, height, *exclude))
+        return rows[0] if rows else None
+
+    @staticmethod
+    def path_link(path: str) -> str:
+        # the trailing slash makes get_image_name() pick the file name, as for WallsCloud links
+        return Path(path).as_uri() + "/"
+
+    @staticmethod
+    def link_path(link: str) -> str:
+        parts = urlsplit(link)
+        path = unquote(parts.path.rstrip("/"))
+        if parts.netloc:
+            path = f"//{parts.netloc}{path}"  # a UNC share
+        elif os.name == "nt":
+            path = path.lstrip("/")
+        return os.path.normpath(path)
@@ -1,20 +1,37 @@
 from abc import ABC, abstractmethod
 
+from parsers.client import HttpClient
+
 
 class Parser(ABC):
     """Base class for all parsers"""
+    pool_size = 8
+    timeout = (5, 30)
+
+    def __init__(self):
+        self.client = HttpClient(self.pool_size, self.timeout)
+
     @abstractmethod
     def get_available_resolutions(self, link: str) -> list:
         pass
 
     @abstractmethod
-    def get_image(self, link: str, resolution: list) -> bytes:
+    def get_image(self, link: str, resolution: list, stem: str, progress=None) -> str:
+        """Saves the image as stem.<format> and returns its path; progress(done, total) reports bytes"""
         pass
 
     @abstractmethod
     def get_image_links(self, query: dict) -> list:
         pass
 
+    def get_page_links(self, query: dict) -> list:
+        """Links of the search page query["page"], parsers without paging return a whole search"""
+        return self.get_image_links(query)
+
+    def find_link(self, query: dict, resolution: list, mode: str = "exact") -> tuple:
+        """(link, source resolution) from an index of the parser, (None, None) when links have to be probed"""
+        return None, None
+
     @abstractmethod
     def get_pages(self, query: dict) -> int:
         pass
@@ -0,0 +1,69 @@
+import ast
+import importlib
+import pkgutil
+import sys
+from pathlib import Path
+
+PACKAGE = Path(__file__).resolve().parent
+# listed after the network sources, in this order; the first parser is the default one
+TRAILING = [".LocalFolder", ".Aggregate"]
+
+
+def discover() -> dict:
+    """Maps the name of every concrete Parser subclass in the parsers package to its import path
+
+    Sources are read with ast so the parser modules (and requests with them) are not imported
+    until one is chosen. Frozen builds ship no sources, so there the modules are imported.
+    """
+    if getattr(sys, "frozen", False):
+        return discover_imported()
+
+    found = {}
+    for path in sorted(PACKAGE.glob("*.py")):
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+        for node in classes.values():
+            name = parser_name(node, classes)
+            if name:
+                found[name] = f"parsers.{path.stem}.{node.name}"
+
+    return dict(sorted(found.items(), key=position))
+
+
+def position(item: tuple) -> int:
+    return next((i + 1 for i, suffix in enumerate(TRAILING) if item[1].endswith(suffix)), 0)
+
+
+def parser_name(node: ast.ClassDef, classes: dict):
+    bases = [base.id for base in node.bases if isinstance(base, ast.Name)]
+    if not any(base == "Parser" or (base in classes and parser_name(classes[base], classes) is not None)
+               for base in bases):
+        return None
+
+    for item in node.body:
+        if isinstance(item, ast.Assign) and any(isinstance(i, ast.Name) and i.id == "name" for i in item.targets):
+            if isinstance(item.value, ast.Constant) and isinstance(item.value.value, str):
+                return item.value.value
+    return None
+
+
+def discover_imported() -> dict:
+    from parsers.parser import Parser
+
+    for module in pkgutil.iter_modules(importlib.import_module("parsers").__path__):
+        importlib.import_module(f"parsers.{module.name}")
+
+    found = {}
+    for cls in subclasses(Parser):
+        if not getattr(cls, "__abstractmethods__", None) and isinstance(getattr(cls, "name", None), str):
+            found[cls.name] = f"{cls.__module__}.{cls.__name__}"
+
+    return dict(sorted(found.items(), key=position))
+
+
+def subclasses(cls) -> list:
+    result = []
+    for sub in cls.__subclasses__():
+        result.append(sub)
+        result.extend(subclasses(sub))
+    return result
@@ -0,0 +1,172 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from scripts.metrics import METRICS
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SourceUnavailable(requests.RequestException):
+    """Raised without touching the network while a host's circuit breaker is open"""
+
+
+class TokenBucket:
+    """Per-host rate limit that halves on throttling and creeps back up on success (AIMD)"""
+    def __init__(self, rate: float, burst: int, min_rate: float = 0.5, max_rate: float = None):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 4
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + 1)
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, lets one trial request through after reset_timeout"""
+    def __init__(self, threshold: int = 5, reset_timeout: float = 60):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self, host: str) -> None:
+        with self._lock:
+            if self.opened is None:
+                return
+            if time.monotonic() - self.opened >= self.reset_timeout and not self._trial:
+                self._trial = True  # half-open
+                return
+        METRICS.incr("circuit_rejections")
+        raise SourceUnavailable(f"{host} is unavailable, retrying after {self.reset_timeout}s")
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened = None
+            self._trial = False
+
+    def failed(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                if self.opened is None or self._trial:
+                    METRICS.incr("circuit_opened")
+                self.opened = time.monotonic()
+                self._trial = False
+
+
+class RequestScheduler:
+    """Admits every parser request through per-host token buckets, an in-flight limit,
+    jittered exponential backoff with Retry-After, and per-host circuit breakers"""
+    def __init__(self, rate: float = 64, burst: int = 32, max_in_flight: int = 8, retries: int = 4,
+                 backoff: float = 0.5, max_backoff: float = 30):
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.buckets = {}
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def host_state(self, url: str) -> tuple:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+                self.breakers[host] = CircuitBreaker()
+            return host, self.buckets[host], self.breakers[host]
+
+    def request(self, send, url: str) -> requests.Response:
+        """Calls send() for url until it succeeds, the retries run out or the breaker opens"""
+        host, bucket, breaker = self.host_state(url)
+
+        for attempt in range(self.retries + 1):
+            breaker.allow(host)
+            bucket.acquire()
+
+            with self.in_flight:
+                try:
+                    res = send()
+                except (requests.ConnectionError, requests.Timeout):
+                    breaker.failed()
+                    if attempt == self.retries:
+                        raise
+                    METRICS.incr("http_retries")
+                    self.wait(attempt)
+                    continue
+                except BaseException:
+                    breaker.failed()  # resolves a half-open trial, which would otherwise block the host for good
+                    raise
+
+            if res.status_code not in RETRY_STATUSES:
+                breaker.succeeded()
+                bucket.succeeded()
+                return res
+
+            METRICS.incr("http_retries")
+            if res.status_code == 429:
+                breaker.succeeded()  # the host answered, only the bucket slows down
+                bucket.throttled()
+            else:
+                breaker.failed()
+
+            if attempt == self.retries:
+                return res
+            delay = self.retry_after(res)
+            res.close()
+            self.wait(attempt, delay)
+
+        return res
+
+    def wait(self, attempt: int, delay: float = None) -> None:
+        if delay is None:
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))  # full jitter
+        time.sleep(min(delay, self.max_backoff))
+
+    @staticmethod
+    def retry_after(res: requests.Response):
+        value = res.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+SCHEDULER = RequestScheduler()
@@ -1,57 +1,71 @@
 from parsers.parser import Parser
-from bs4 import BeautifulSoup
-import requests
+from parsers.cache import TTLCache
+from parsers.extract import extract_quantity, extract_wall_links, extract_resolutions
+from scripts.metrics import METRICS
+from scripts.support import data_path
 import math
-from random import random
-from PIL import Image
-import io
+from random import randint
 
 
 class WallsCloud(Parser):
     url = "https://wallscloud.net/ru/search"
     name = "WallsCloud"
+    per_page = 35
+    cache_path = None  # search_cache.json in the per-user data directory
+
+    def __init__(self):
+        super().__init__()
+        self.cache = TTLCache(self.cache_path or data_path("search_cache.json"))
 
     def get_available_resolutions(self, link):
-        req = requests.get(link)
-        soup = BeautifulSoup(req.text, "html.parser")
-        block = soup.find("div", class_="resblocks")
-        resolutions = [list(map(int, i.text.split(" x "))) for i in block.find_all("a", recursive=True)]
-        return resolutions
+        req = self.client.get(link)
+        return extract_resolutions(req.text)
 
-    def get_image(self, link: str, resolution: list) -> Image:
+    def get_image(self, link: str, resolution: list, stem: str, progress=None) -> str:
         ref_download = f"{link}/{resolution[0]}x{resolution[1]}/download"
-        byte = requests.get(ref_download).content
-
-        return Image.open(io.BytesIO(byte))
+        return self.client.download(ref_download, stem, progress)
 
     def get_image_links(self, query: dict):
-        pages = self.get_pages(query)
-        images = []
+        # a cached count and cached pages make the random page free; an unknown count costs page 1
+        query["page"] = randint(1, max(self.get_pages(query), 1))
+        images = self.get_page_links(query)
 
-        query["page"] = round(random() * pages + 1)
-        soup = BeautifulSoup(requests.get(self.url, params=query).content, "html.parser")
-        block = soup.find('div', class_="grid-row walls_data")
         print("query: ", query)
-
-        if block.find("figure"):
-            for j in block.find_all("a", class_="wall_link"):
-                images.append(j["href"])
-
         print("Image links: ", images)
 
         return images
 
+    def get_page_links(self, query: dict) -> list:
+        images = self.cache.get(f"links:{self.query_key(query)}:{query['page']}")
+        if images is None:
+            _, images = self.fetch_search_page(query)
+        return images
+
     def get_pages(self, query: dict):
-        pages = math.ceil(self.get_quantity(query) / 35)
+        with METRICS.span("page_count"):
+            pages = math.ceil(self.get_quantity(query) / self.per_page)
         print("pages:", pages)
         return pages
 
     def get_quantity(self, query: dict):
-        res = requests.get(self.url, params=query)
-        soup = BeautifulSoup(res.text, 'html.parser')
-        page_title = soup.find('div', class_='page-title')
-        pictures = page_title.find('small').text
-        pictures = int(pictures.split()[0])
+        pictures = self.cache.get(f"quantity:{self.query_key(query)}")
+        if pictures is None:
+            pictures, _ = self.fetch_search_page({**query, "page": 1})
         return pictures
 
+    def fetch_search_page(self, query: dict) -> tuple:
+        """Downloads one search page and caches both the result count and the links found on it"""
+        res = self.client.get(self.url, params=query, revalidate=True)
+        pictures = extract_quantity(res.text)
+        images = extract_wall_links(res.text)
+
+        key = self.query_key(query)
+        self.cache.set(f"quantity:{key}", pictures)
+        self.cache.set(f"links:{key}:{query['page']}", images)
+
+        return pictures, images
+
+    def query_key(self, query: dict) -> str:
+        return f"{self.url}?q={query.get('q', '')}&orientation={query.get('orientation', '')}"
+
 
@@ -0,0 +1,297 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from scripts import image_stats
+from scripts.metrics import METRICS
+from scripts.rotation import choose_resolution
+
+CATALOG_NAME = "catalog.sqlite3"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    link TEXT PRIMARY KEY,
+    probed REAL,
+    downloaded REAL,
+    picked REAL,
+    shown REAL,
+    path TEXT,
+    width INTEGER,
+    height INTEGER
+);
+CREATE TABLE IF NOT EXISTS query_links (
+    source TEXT NOT NULL,
+    q TEXT NOT NULL,
+    orientation TEXT NOT NULL,
+    link TEXT NOT NULL,
+    listed REAL NOT NULL,
+    PRIMARY KEY (source, q, orientation, link)
+);
+CREATE TABLE IF NOT EXISTS resolutions (
+    link TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    PRIMARY KEY (link, width, height)
+);
+CREATE TABLE IF NOT EXISTS stats (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    luminance REAL NOT NULL,
+    contrast REAL NOT NULL,
+    colors TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS resolutions_size ON resolutions (width, height);
+CREATE INDEX IF NOT EXISTS links_path ON links (path);
+CREATE INDEX IF NOT EXISTS links_shown ON links (shown);
+"""
+
+
+class Catalog:
+    """SQLite record of every link seen per query, its probed resolutions and its download history
+
+    Lets a rotation pick a never-shown match without probing and keeps rotating through
+    downloaded files while the source is unreachable. Content statistics of the downloaded
+    files let brightness and colour rules choose between them without decoding anything.
+    """
+    def __init__(self, directory: str, pick_timeout: float = 3600):
+        self.directory = directory
+        self.path = os.path.join(directory, CATALOG_NAME)
+        self.pick_timeout = pick_timeout
+        self.closed = False
+        self._db = None
+        self._lock = threading.Lock()
+
+        parent = os.path.abspath(directory)
+        while not os.path.exists(parent):
+            parent = os.path.dirname(parent)
+        if not os.path.isdir(parent) or not os.access(parent, os.W_OK):
+            raise PermissionError(f"{parent} is not a writable directory")
+        with self._lock:
+            self.connect()  # surfaces an unreadable catalog right away, a missing directory is fine
+
+    def connect(self):
+        """The connection, opened once the directory exists; downloads create it, the catalog never does"""
+        if self._db is None and not self.closed and os.path.isdir(self.directory):
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            try:
+                db.executescript(SCHEMA)
+            except sqlite3.Error:
+                db.close()
+                raise
+            self._db = db
+        return self._db
+
+    @contextmanager
+    def session(self, write: bool = False):
+        """Holds the lock and yields the connection, None before the directory exists or after close()"""
+        with self._lock:
+            db = self.connect()
+            if db is None or not write:
+                yield db
+            else:
+                with db:
+                    yield db
+
+    def add_links(self, source: str, query: dict, links: list) -> None:
+        now = time.time()
+        key = (source, query.get("q", ""), query.get("orientation", ""))
+        with self.session(write=True) as db:
+            if db is None:
+                return
+            db.executemany("INSERT OR IGNORE INTO links (link) VALUES (?)", [(i,) for i in links])
+            db.executemany("INSERT OR REPLACE INTO query_links VALUES (?, ?, ?, ?, ?)",
+                           [(*key, link, now) for link in links])
+
+    def resolutions(self, link: str):
+        """Returns the probed resolutions of a link or None if it was never probed"""
+        with self.session() as db:
+            if db is None:
+                return None
+            row = db.execute("SELECT probed FROM links WHERE link = ?", (link,)).fetchone()
+            if row is None or row[0] is None:
+                return None
+            rows = db.execute("SELECT width, height FROM resolutions WHERE link = ?", (link,)).fetchall()
+        return [list(i) for i in rows]
+
+    def add_resolutions(self, link: str, resolutions: list) -> None:
+        with self.session(write=True) as db:
+            if db is None:
+                return
+            db.execute("INSERT INTO links (link, probed) VALUES (?, ?) "
+                       "ON CONFLICT (link) DO UPDATE SET probed = excluded.probed", (link, time.time()))
+            db.executemany("INSERT OR IGNORE INTO resolutions VALUES (?, ?, ?)",
+                           [(link, i[0], i[1]) for i in resolutions])
+
+    def probe(self, get_available_res):
+        """Wraps get_available_resolutions so every link is fetched from the source only once"""
+        def cached(link: str) -> list:
+            available = self.resolutions(link)
+            if available is not None:
+                METRICS.incr("catalog_probe_hits")
+                return available
+
+            available = get_available_res(link)
+            self.add_resolutions(link, available)
+            return available
+        return cached
+
+    def pick(self, source: str, query: dict, resolution: list, mode: str = "exact") -> tuple:
+        """Returns an undownloaded (link, source resolution) of the query straight from the index or (None, None)"""
+        key = (source, query.get("q", ""), query.get("orientation", ""))
+        width, height = resolution
+        if mode == "exact":
+            size = "r.width = ? AND r.height = ?"
+        else:
+            # choose_resolution() settles the covering/same ratio order below
+            size = "((r.width >= ? AND r.height >= ?) OR abs(1.0 * r.width / r.height - ?) < 0.01)"
+        params = (width, height) if mode == "exact" else (width, height, width / height)
+
+        with self.session() as db:
+            if db is None:
+                return None, None
+            rows = db.execute(
+                "SELECT l.link FROM query_links q JOIN links l ON l.link = q.link "
+                "JOIN resolutions r ON r.link = l.link WHERE q.source = ? AND q.q = ? AND q.orientation = ? "
+                "AND l.shown IS NULL AND l.downloaded IS NULL AND l.probed IS NOT NULL "
+                f"AND (l.picked IS NULL OR l.picked < ?) AND {size} "
+                "GROUP BY l.link ORDER BY random() LIMIT 16",
+                (*key, time.time() - self.pick_timeout, *params)).fetchall()
+
+        for (link,) in rows:
+            chosen = choose_resolution(self.resolutions(link) or [], list(resolution), mode)
+            if chosen is not None:
+                self.picked(link)
+                return link, chosen
+
+        return None, None
+
+    def picked(self, link: str) -> None:
+        """Holds the link back from pick() for pick_timeout, it is on its way to being downloaded"""
+        with self.session(write=True) as db:
+            if db is not None:
+                db.execute("INSERT INTO links (link, picked) VALUES (?, ?) "
+                           "ON CONFLICT (link) DO UPDATE SET picked = excluded.picked", (link, time.time()))
+
+    def downloaded(self, link: str, resolution: list, path: str) -> None:
+        with self.session(write=True) as db:
+            if db is None:
+                return
+            db.execute("INSERT INTO links (link) VALUES (?) ON CONFLICT (link) DO NOTHING", (link,))
+            db.execute("UPDATE links SET downloaded = ?, path = ?, width = ?, height = ? WHERE link = ?",
+                       (time.time(), path, resolution[0], resolution[1], link))
+
+    def shown(self, path: str) -> None:
+        with self.session(write=True) as db:
+            if db is not None:
+                db.execute("UPDATE links SET shown = ? WHERE path = ?", (time.time(), path))
+
+    def offline(self, resolution: list, rule: str = "any", colour: str = ""):
+        """Returns the least recently shown downloaded file for the resolution that still exists or None
+
+        A brightness rule or colour theme picks the best match among the least recently shown ones.
+        """
+        with self.session() as db:
+            if db is None:
+                return None
+            rows = db.execute(
+                "SELECT path FROM links WHERE path IS NOT NULL AND width = ? AND height = ? "
+                "ORDER BY coalesce(shown, 0) LIMIT 64", tuple(resolution)).fetchall()
+
+        return self.choose([path for path, in rows if os.path.exists(path)], rule, colour)
+
+    def stats(self, paths: list) -> dict:
+        """{path: (luminance, contrast, colours)} of the indexed paths"""
+        return {path: tuple(values) for path, *values in self.select_stats("luminance, contrast, colors", paths)}
+
+    def select_stats(self, columns: str, paths: list) -> list:
+        rows = []
+        with self.session() as db:
+            if db is None:
+                return rows
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                rows += db.execute(f"SELECT path, {columns} FROM stats "
+                                   f"WHERE path IN ({', '.join('?' * len(chunk))})", chunk).fetchall()
+        return rows
+
+    def choose(self, paths: list, rule: str = "any", colour: str = ""):
+        """The path that suits the brightness rule and colour theme best, the first one without a preference"""
+        if rule == "any" and not colour:
+            return paths[0] if paths else None
+        return image_stats.choose(paths, self.stats(paths), rule, colour)
+
+    def index_stats(self, paths: list) -> int:
+        """Computes the statistics of new or changed files in batches on the imaging pool, returns their count
+
+        Every group of batches is stored as it completes, the rest is dropped once the catalog is closed.
+        """
+        if not paths or not image_stats.available():
+            return 0
+
+        known = {path: (mtime, size) for path, mtime, size in self.select_stats("mtime, size", paths)}
+        changed = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) != (stat.st_mtime, stat.st_size):
+                changed[path] = (stat.st_mtime, stat.st_size)
+
+        from scripts.imaging import WORKERS, executor
+
+        pending = list(changed)
+        indexed = 0
+        step = image_stats.BATCH * WORKERS
+        for start in range(0, len(pending), step):
+            if self.closed:
+                break
+            group = pending[start:start + step]
+            with METRICS.span("image_stats"):
+                batches = [executor().submit(image_stats.compute, group[i:i + image_stats.BATCH])
+                           for i in range(0, len(group), image_stats.BATCH)]
+                rows = [row for batch in batches for row in batch.result()]
+
+            with self.session(write=True) as db:
+                if db is None:
+                    break
+                db.executemany("INSERT OR REPLACE INTO stats VALUES (?, ?, ?, ?, ?, ?)",
+                               [(path, *changed[path], luminance, contrast, colours)
+                                for path, luminance, contrast, colours in rows])
+            indexed += len(rows)
+            METRICS.incr("stats_indexed", len(rows))
+        return indexed
+
+    def refresh_stats(self) -> int:
+        """Indexes the images of the directory that are new or changed and forgets removed ones"""
+        if not os.path.isdir(self.directory):
+            return 0
+
+        paths = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in image_stats.EXTENSIONS:
+                    paths.append(entry.path)
+
+        with self.session(write=True) as db:
+            if db is None:
+                return 0
+            indexed = [path for path, in db.execute("SELECT path FROM stats")]
+            present = set(paths)
+            db.executemany("DELETE FROM stats WHERE path = ?", [(i,) for i in indexed if i not in present])
+
+        return self.index_stats(paths)
+
+    def move_stats(self, source: str, path: str) -> None:
+        with self.session(write=True) as db:
+            if db is not None:
+                db.execute("UPDATE OR REPLACE stats SET path = ? WHERE path = ?", (path, source))
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            if self._db is not None:
+                self._db.close()
+                self._db = None
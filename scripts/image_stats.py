@@ -0,0 +1,126 @@
+"""Content statistics of wallpapers: mean luminance, contrast and dominant colours
+
+Computed in vectorized numpy batches over small thumbnails, so indexing a whole library costs
+one pass and choosing a wallpaper at tick time never decodes an image. numpy is optional:
+without it nothing gets indexed and every rule keeps the plain order.
+"""
+import re
+import time
+
+THUMBNAIL = (64, 64)
+BATCH = 32
+LEVELS = 4  # per channel, the colour histogram has LEVELS ** 3 bins
+DOMINANT = 3
+LUMA = (0.2126, 0.7152, 0.0722)
+RULES = ["any", "dark", "light", "night"]
+NIGHT_HOURS = (20, 7)
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp"}
+
+
+def available() -> bool:
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def thumbnail(path: str):
+    """Small RGB copy of the image, decoded at a fraction of its size where the format allows it"""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.draft("RGB", THUMBNAIL)
+        return img.convert("RGB").resize(THUMBNAIL, Image.Resampling.BOX)
+
+
+def compute(paths: list) -> list:
+    """Worker entry point: (path, luminance, contrast, colours) for every readable image of the batch
+
+    Luminance and contrast are the mean and standard deviation of the Rec. 709 luma in 0..1,
+    colours the centres of the most populated bins of a coarse RGB histogram as "#rrggbb".
+    """
+    import numpy as np
+
+    readable, thumbnails = [], []
+    for path in paths:
+        try:
+            thumbnails.append(np.asarray(thumbnail(path), dtype=np.uint8))
+        except Exception as e:
+            print("STATISTICS FAILED: ", path, e)
+            continue
+        readable.append(path)
+    if not readable:
+        return []
+
+    pixels = np.stack(thumbnails).reshape(len(readable), -1, 3)
+    luma = pixels @ np.array(LUMA, dtype=np.float32) / 255
+    luminance = luma.mean(axis=1)
+    contrast = luma.std(axis=1)
+
+    step = 256 // LEVELS
+    bins = LEVELS ** 3
+    levels = pixels // step
+    codes = (levels[..., 0].astype(np.int64) * LEVELS + levels[..., 1]) * LEVELS + levels[..., 2]
+    codes += np.arange(len(readable))[:, None] * bins
+    counts = np.bincount(codes.ravel(), minlength=len(readable) * bins).reshape(len(readable), bins)
+    dominant = np.argsort(-counts, axis=1, kind="stable")[:, :DOMINANT]
+
+    rows = []
+    for i, path in enumerate(readable):
+        colours = []
+        for code in dominant[i]:
+            if counts[i, code]:
+                red, green, blue = code // LEVELS ** 2, code // LEVELS % LEVELS, code % LEVELS
+                colours.append("#%02x%02x%02x" % tuple(level * step + step // 2 for level in (red, green, blue)))
+        rows.append((path, float(luminance[i]), float(contrast[i]), ",".join(colours)))
+    return rows
+
+
+def is_night(hour: int) -> bool:
+    start, end = NIGHT_HOURS
+    return hour >= start or hour < end
+
+
+def score(luminance: float, colours: str, rule: str, colour: str = "", hour: int = None) -> float:
+    """Lower is better: distance of the statistics from what the rule and the colour theme ask for"""
+    if hour is None:
+        hour = time.localtime().tm_hour
+
+    result = 0.0
+    if rule == "dark" or (rule == "night" and is_night(hour)):
+        result += luminance
+    elif rule == "light":
+        result += 1 - luminance
+
+    if colour and colours:
+        target = rgb(colour)
+        result += min(sum((a - b) ** 2 for a, b in zip(target, rgb(i))) for i in colours.split(",")) ** 0.5 / 441.7
+    return result
+
+
+def choose(paths: list, stats: dict, rule: str = "any", colour: str = "", hour: int = None) -> str:
+    """The best path for the rule; paths keep their order on ties and unindexed ones rank last"""
+    if not paths:
+        return None
+    if rule not in RULES[1:] and not colour:
+        return paths[0]
+
+    ranked = [(score(stats[path][0], stats[path][2], rule, colour, hour) if path in stats else 2.0, i)
+              for i, path in enumerate(paths)]
+    return paths[min(ranked)[1]]
+
+
+def colour_value(text: str) -> str:
+    """Normalizes "204080" or "#204080" to "#204080", raises ValueError for anything else"""
+    value = text.strip().lower()
+    if not value.startswith("#"):
+        value = f"#{value}"
+    if not re.fullmatch(r"#[0-9a-f]{6}", value):
+        raise ValueError(f"not a #rrggbb colour: {text}")
+    return value
+
+
+def rgb(colour: str) -> tuple:
+    value = colour.lstrip("#")
+    return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
@@ -0,0 +1,187 @@
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+JPEG_QUALITY = 92
+WORKERS = 2
+TASKS_PER_WORKER = 16
+MAX_DECODED_PIXELS = 40_000_000  # 8K UHD with some margin
+EXIF_ORIENTATION = 0x0112
+
+_executor = None
+_lock = threading.Lock()
+
+
+def decode(img, size: tuple) -> None:
+    """Prepares an opened image for crops of at least size: drafted, checked against the cap, upright"""
+    from PIL import ImageOps
+
+    img.draft("RGB", size)
+    if img.width * img.height > MAX_DECODED_PIXELS:
+        raise ValueError(f"{img.filename} is {img.width}x{img.height}, more than {MAX_DECODED_PIXELS} pixels to decode")
+    ImageOps.exif_transpose(img, in_place=True)
+
+
+def cover(img, size: tuple):
+    """Scales and centre-crops the decoded image to fill size exactly"""
+    from PIL import Image, ImageOps
+
+    factor = min(img.width // size[0], img.height // size[1])
+    frame = img.reduce(factor) if factor > 1 else img
+    if frame.mode != "RGB":
+        frame = frame.convert("RGB")
+    return ImageOps.fit(frame, size, Image.Resampling.LANCZOS)
+
+
+def fit_image(source: str, resolution: list, stem: str) -> str:
+    """Scales and centre-crops an image to fill the resolution exactly, saves it as stem.jpeg
+
+    JPEG sources are decoded with draft(), which lets libjpeg scale down by 1/2..1/8 while
+    decoding, so an oversized picture never has more pixels decoded than the crop needs.
+    Other formats are decoded once, refused above MAX_DECODED_PIXELS, and box-reduced
+    before resampling so no full-size copy is made.
+    """
+    from PIL import Image
+
+    size = tuple(resolution)
+    path = f"{stem}.jpeg"
+
+    with Image.open(source) as img:
+        decode(img, size)
+        fitted = cover(img, size)
+
+    fitted.save(path, "JPEG", quality=JPEG_QUALITY)
+    return path
+
+
+def fit_screens(source: str, screens: list, stem: str) -> str:
+    """Fills every screen from one decode of the image, saves the virtual desktop as stem.jpeg
+
+    screens are [x, y, width, height] in physical pixels. Each screen gets its own crop and
+    scale of the same decoded frame, pasted where the screen sits, so the result can be set
+    as one wallpaper spanning all of them.
+    """
+    from PIL import Image
+
+    left, top, right, bottom = desktop_bounds(screens)
+    path = f"{stem}.jpeg"
+
+    with Image.open(source) as img:
+        decode(img, (max(i[2] for i in screens), max(i[3] for i in screens)))
+        canvas = Image.new("RGB", (right - left, bottom - top))
+        for x, y, width, height in screens:
+            canvas.paste(cover(img, (width, height)), (x - left, y - top))
+
+    canvas.save(path, "JPEG", quality=JPEG_QUALITY)
+    return path
+
+
+def desktop_bounds(screens: list) -> tuple:
+    """(left, top, right, bottom) of the virtual desktop that holds the screens"""
+    return (min(i[0] for i in screens), min(i[1] for i in screens),
+            max(i[0] + i[2] for i in screens), max(i[1] + i[3] for i in screens))
+
+
+def output_size(resolution: list, screens: list = None) -> list:
+    """Size of the finished wallpaper: the resolution, or the virtual desktop when several screens share it"""
+    if not screens or len(screens) < 2:
+        return list(resolution)
+
+    left, top, right, bottom = desktop_bounds(screens)
+    return [right - left, bottom - top]
+
+
+def needs_processing(source: str, resolution: list) -> bool:
+    """Reads only the header: True when the size differs or an EXIF orientation has to be applied"""
+    from PIL import Image
+
+    with Image.open(source) as img:
+        return list(img.size) != list(resolution) or img.getexif().get(EXIF_ORIENTATION, 1) != 1
+
+
+def process_image(source: str, resolution: list, stem: str, screens: list = None) -> tuple:
+    """Worker entry point: returns (path of the result, peak memory of the worker in bytes)
+
+    The result is source itself when it already fits. Only paths cross the process boundary.
+    """
+    if screens and len(screens) > 1:
+        path = fit_screens(source, screens, stem)
+    elif needs_processing(source, resolution):
+        path = fit_image(source, resolution, stem)
+    else:
+        path = source
+    return path, peak_memory()
+
+
+def peak_memory() -> int:
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + \
+                       [(name, ctypes.c_size_t) for name in
+                        ["PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                         "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage",
+                         "PeakPagefileUsage"]]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                  ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize
+
+    if os.path.exists("/proc/self/status"):
+        # unlike ru_maxrss, VmHWM is not inherited from the parent across exec
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def executor() -> ProcessPoolExecutor:
+    """Small spawn-based pool, created on first use; workers are replaced regularly to return memory"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                                            max_tasks_per_child=TASKS_PER_WORKER)
+        return _executor
+
+
+def postprocess(source: str, resolution: list, stem: str, screens: list = None) -> str:
+    """Runs process_image in the pool and returns the path to use; source is removed if it was replaced
+
+    The header check runs here, so a file that already fits never waits for a worker.
+    """
+    from scripts.metrics import METRICS
+
+    if not (screens and len(screens) > 1) and not needs_processing(source, resolution):
+        return source
+
+    try:
+        path, peak = executor().submit(process_image, source, list(resolution), stem, screens).result()
+    except BrokenProcessPool:
+        shutdown()  # a worker died, e.g. killed for memory; the next call starts a fresh pool
+        raise
+    METRICS.gauge("imaging_worker_peak_bytes", peak)
+
+    if path != source:
+        os.remove(source)
+    return path
+
+
+def shutdown() -> None:
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+from scripts.metrics import METRICS
+
+INDEX_NAME = "library.json"
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class WallpaperLibrary:
+    """Bounded index of downloaded wallpapers with LRU eviction and content-hash dedup"""
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 ** 3, max_count: int = 500):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_count = max_count
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        self.current = None
+        self._lock = threading.RLock()
+        self._files = {}
+        self._links = {}
+        self.load()
+
+    def lookup(self, link: str, resolution: list):
+        """Returns the local path of a link downloaded before or None"""
+        with self._lock:
+            name = self._links.get(self.link_key(link, resolution))
+            if name is None:
+                return None
+
+            path = os.path.join(self.directory, name)
+            if not os.path.exists(path):
+                self.forget(name)
+                self.save()
+                return None
+
+            self._files[name]["used"] = time.time()
+            self.save()
+            METRICS.incr("library_hits")
+            return path
+
+    def add(self, link: str, resolution: list, path: str) -> str:
+        """Registers a freshly downloaded file and returns the path that should be used for it"""
+        digest = file_hash(path)
+        name = os.path.basename(path)
+
+        with self._lock:
+            duplicate = next((other for other, entry in self._files.items()
+                              if entry["hash"] == digest and other != name), None)
+            if duplicate and os.path.exists(os.path.join(self.directory, duplicate)):
+                os.remove(path)
+                name = duplicate
+            else:
+                if name in self._files and self._files[name]["hash"] != digest:
+                    self._links = {key: value for key, value in self._links.items() if value != name}
+                self._files[name] = {"hash": digest, "size": os.path.getsize(path)}
+
+            self._files[name]["used"] = time.time()
+            self._links[self.link_key(link, resolution)] = name
+            self.evict()
+            self.save()
+
+        return os.path.join(self.directory, name)
+
+    def touch(self, path: str) -> None:
+        """Marks a file as the current wallpaper, which protects it from eviction"""
+        name = os.path.basename(path)
+
+        with self._lock:
+            self.current = name
+            if name in self._files:
+                self._files[name]["used"] = time.time()
+                self.save()
+
+    def random_file(self):
+        """Returns a stored wallpaper other than the current one or None, used while sources are down"""
+        with self._lock:
+            names = [name for name in self._files if name != self.current]
+
+        random.shuffle(names)
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def evict(self) -> None:
+        with self._lock:
+            total = sum(entry["size"] for entry in self._files.values())
+            for name in sorted(self._files, key=lambda x: self._files[x]["used"]):
+                if total <= self.max_bytes and len(self._files) <= self.max_count:
+                    break
+                if name == self.current:
+                    continue
+
+                total -= self._files[name]["size"]
+                path = os.path.join(self.directory, name)
+                if os.path.exists(path):
+                    os.remove(path)
+                self.forget(name)
+                print("Evicted: ", path)
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            self._files.pop(name, None)
+            self._links = {key: value for key, value in self._links.items() if value != name}
+
+    def load(self) -> None:
+        if not os.path.exists(self.index_path):
+            return
+
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        self._files = index.get("files", {})
+        self._links = index.get("links", {})
+
+    def save(self) -> None:
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{self.index_path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"files": self._files, "links": self._links}, f)
+            os.replace(tmp, self.index_path)
+
+    @staticmethod
+    def link_key(link: str, resolution: list) -> str:
+        return f"{link}|{resolution[0]}x{resolution[1]}"
@@ -0,0 +1,131 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from random import shuffle
+
+
+class LinkPool:
+    """Candidate links gathered from several search pages and handed out without replacement"""
+    def __init__(self, parser, query: dict, pages_per_fill: int = 3, low_water: int = 24, catalog=None,
+                 page_retries: int = 2):
+        self.parser = parser
+        self.query = dict(query)
+        self.catalog = catalog
+        self.pages_per_fill = pages_per_fill
+        self.low_water = low_water
+        self.page_retries = page_retries
+        self._failures = {}
+        self._links = deque()
+        self._seen = set()
+        self._cursor = None
+        self._filling = False
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._links)
+
+    def fill(self, cancelled=None) -> None:
+        """Fetches the next pages of the shuffled cursor concurrently and adds their unseen links
+
+        Once cancelled() returns True no further page is requested; pages left out stay on the cursor,
+        as do failed pages until they have failed page_retries times. SourceUnavailable is re-raised
+        so the caller can rotate offline.
+        """
+        with self._condition:
+            while self._filling:
+                self._condition.wait()
+            self._filling = True
+            new_pass = self._cursor is None
+
+        pages, results = [], []
+        try:
+            cursor = self.new_cursor() if new_pass else None
+            with self._condition:
+                if new_pass:
+                    self._cursor = cursor
+                if cancelled is None or not cancelled():
+                    pages = [self._cursor.pop() for _ in range(min(self.pages_per_fill, len(self._cursor)))]
+
+            if pages:
+                with ThreadPoolExecutor(max_workers=len(pages)) as executor:
+                    futures = [executor.submit(self.fetch_page, page, cancelled) for page in pages]
+                results = [None if future.exception() else future.result() for future in futures]
+                errors = [future.exception() for future in futures if future.exception()]
+                if errors:
+                    raise errors[0]
+        finally:
+            with self._condition:
+                for page, links in zip(pages, results):
+                    if links is None:
+                        self._cursor.append(page)
+                        continue
+                    for link in links:
+                        if link not in self._seen:
+                            self._seen.add(link)
+                            self._links.append(link)
+                self._filling = False
+                self._condition.notify_all()
+
+        print("Link pool: ", len(self), "links, pages left:", len(self._cursor or []))
+
+    def fetch_page(self, page: int, cancelled=None) -> list:
+        """Links of the page, None if it should be fetched again later or without a request once cancelled"""
+        from parsers.scheduler import SourceUnavailable
+
+        if cancelled is not None and cancelled():
+            return None
+
+        try:
+            links = self.parser.get_page_links({**self.query, "page": page})
+        except SourceUnavailable:
+            raise
+        except Exception as e:
+            print("PAGE FAILED: ", page, e)
+            with self._condition:
+                self._failures[page] = self._failures.get(page, 0) + 1
+                return [] if self._failures[page] >= self.page_retries else None
+
+        if self.catalog is not None:
+            self.catalog.add_links(self.parser.name, self.query, links)
+        return links
+
+    def new_cursor(self) -> list:
+        pages = list(range(1, max(self.parser.get_pages(self.query), 1) + 1))
+        shuffle(pages)
+        return pages
+
+    def take(self, count: int) -> list:
+        """Hands out up to count links; an empty list means the current pass is exhausted"""
+        with self._condition:
+            if not self._links and self._cursor == [] and not self._filling:
+                self._cursor = None  # the next take starts a new pass
+                self._seen.clear()
+                return []
+
+        while not len(self) and self.has_pages():
+            self.fill()
+
+        with self._condition:
+            links = [self._links.popleft() for _ in range(min(count, len(self._links)))]
+            shuffle(links)
+            refill = len(self._links) < self.low_water and not self._filling and self._cursor
+
+        if refill:
+            threading.Thread(target=self.refill, daemon=True).start()
+
+        return links
+
+    def refill(self) -> None:
+        try:
+            self.fill()
+        except Exception as e:
+            print("REFILL FAILED: ", e)
+
+    def put_back(self, links: list) -> None:
+        with self._condition:
+            self._links.extendleft(reversed(links))
+
+    def has_pages(self) -> bool:
+        with self._condition:
+            return self._cursor is None or bool(self._cursor) or self._filling
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from scripts.support import data_path
+
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+STAGES = ["search", "page_count", "probe", "download", "fit", "save", "set_wallpaper"]
+
+
+class Metrics:
+    """Timing spans per stage, plus monotonic counters and gauges
+
+    Percentiles come from a rolling window of samples, the histogram buckets, count and sum
+    accumulate over the lifetime of the process as Prometheus expects.
+    """
+    def __init__(self, window: int = 256):
+        self.window = window
+        self._samples = {}
+        self._totals = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+            count, total, buckets = self._totals.get(stage, (0, 0.0, [0] * len(BUCKETS)))
+            self._totals[stage] = (count + 1, total + seconds,
+                                   [n + (seconds <= bound) for n, bound in zip(buckets, BUCKETS)])
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+            totals = dict(self._totals)  # observe() replaces the bucket lists, never mutates them
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        stages = {}
+        for stage, values in samples.items():
+            stages[stage] = {
+                "count": totals[stage][0],
+                "sum": totals[stage][1],
+                "window": len(values),
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "max": values[-1],
+                "buckets": dict(zip(map(str, BUCKETS), totals[stage][2])),
+            }
+
+        return {"time": time.time(), "stages": stages, "counters": counters, "gauges": gauges}
+
+    def to_prometheus(self, snapshot: dict = None) -> str:
+        snapshot = snapshot or self.snapshot()
+        lines = ["# TYPE wallpaster_stage_seconds histogram"]
+        for stage, data in snapshot["stages"].items():
+            for bound, count in data["buckets"].items():
+                lines.append(f'wallpaster_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'wallpaster_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {data["count"]}')
+            lines.append(f'wallpaster_stage_seconds_sum{{stage="{stage}"}} {data["sum"]}')
+            lines.append(f'wallpaster_stage_seconds_count{{stage="{stage}"}} {data["count"]}')
+
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# TYPE wallpaster_{name}_total counter")
+            lines.append(f"wallpaster_{name}_total {value}")
+
+        for name, value in snapshot["gauges"].items():
+            lines.append(f"# TYPE wallpaster_{name} gauge")
+            lines.append(f"wallpaster_{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: str = None) -> None:
+        """Writes metrics.json and metrics.prom atomically, by default to the per-user data directory"""
+        snapshot = self.snapshot()
+        for name, text in [("metrics.json", json.dumps(snapshot, indent=2)),
+                           ("metrics.prom", self.to_prometheus(snapshot))]:
+            path = data_path(name) if directory is None else os.path.join(directory, name)
+            with open(f"{path}.tmp", "w") as f:
+                f.write(text)
+            os.replace(f"{path}.tmp", path)
+
+    def summary(self) -> list:
+        """Short human-readable lines for the tray menu"""
+        snapshot = self.snapshot()
+        lines = [f"{stage}: p50 {data['p50'] * 1000:.0f} ms, p95 {data['p95'] * 1000:.0f} ms ({data['count']})"
+                 for stage, data in sorted(snapshot["stages"].items(),
+                                           key=lambda x: STAGES.index(x[0]) if x[0] in STAGES else len(STAGES))]
+        counters = snapshot["counters"]
+        if counters:
+            lines.append(", ".join(f"{name}: {format_count(name, value)}" for name, value in sorted(counters.items())))
+        if snapshot["gauges"]:
+            lines.append(", ".join(f"{name}: {format_count(name, value)}"
+                                   for name, value in sorted(snapshot["gauges"].items())))
+        return lines or ["No rotations yet"]
+
+
+def percentile(values: list, share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def format_count(name: str, value: int) -> str:
+    if name.endswith("bytes"):
+        return f"{value / 1024 / 1024:.1f} MiB"
+    return str(value)
+
+
+METRICS = Metrics()
@@ -0,0 +1,161 @@
+import os
+import threading
+from collections import deque
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal as Signal
+
+from scripts.imaging import output_size
+from scripts.rotation import select_link, download_image
+
+PREFETCH_DIR = ".prefetch"
+
+
+class Prefetcher(QObject):
+    """Keeps the next wallpapers downloaded in the background so a slideshow tick only sets one"""
+    fill_requested = Signal()
+
+    def __init__(self, depth: int = 3, budget: int = 200 * 1024 * 1024):
+        super().__init__()
+        self.depth = depth
+        self.budget = budget
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._key = None
+        self._params = None
+        self._stopped = False
+
+        self.thread = QThread()
+        self.moveToThread(self.thread)
+        self.fill_requested.connect(self.fill)
+        self.thread.start()
+
+    def configure(self, pool, resolution: list, directory: str, library=None, mode: str = "exact",
+                  catalog=None, screens: list = None) -> None:
+        """Points the queue at a new search, dropping everything prepared for the previous one"""
+        key = (id(pool), tuple(resolution), mode, tuple(map(tuple, screens or [])))
+
+        with self._lock:
+            self._params = (pool, list(resolution), directory, library, mode, catalog, screens)
+            if key == self._key:
+                return
+            self._key = key
+
+        self.invalidate()
+        self.request_fill()
+
+    def clear(self) -> None:
+        """Drops everything prepared and fills nothing until the next configure(), e.g. while a new search runs"""
+        with self._lock:
+            self._params = None
+            self._key = None
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            stale = list(self._queue)
+            self._queue.clear()
+
+        for _, path, _ in stale:
+            if self.is_staged(path) and os.path.exists(path):
+                os.remove(path)
+
+    def request_fill(self) -> None:
+        if self._params is not None:
+            self.fill_requested.emit()
+
+    def pop(self, directory: str, library=None, catalog=None, rule: str = "any", colour: str = ""):
+        """Moves a prepared wallpaper into the directory and returns its path or None
+
+        That is the oldest one, unless a brightness rule or colour theme prefers another.
+        """
+        while True:
+            with self._lock:
+                paths = [path for _, path, _ in self._queue]
+            chosen = catalog.choose(paths, rule, colour) if catalog is not None else None
+
+            with self._lock:
+                if not self._queue:
+                    return None
+                index = next((i for i, item in enumerate(self._queue) if item[1] == chosen), 0)
+                link, path, resolution = self._queue[index]
+                del self._queue[index]
+
+            if os.path.exists(path):
+                break
+            print("PREFETCHED FILE MISSING: ", path)  # evicted or deleted meanwhile, try the next one
+
+        if not self.is_staged(path):
+            return path
+
+        staged = path
+        path = os.path.join(directory, os.path.basename(staged))
+        os.makedirs(directory, exist_ok=True)
+        os.replace(staged, path)
+        if catalog is not None:
+            catalog.move_stats(staged, path)
+
+        if library is not None:
+            path = library.add(link, resolution, path)
+        if catalog is not None:
+            catalog.downloaded(link, resolution, path)
+
+        return path
+
+    @staticmethod
+    def is_staged(path: str) -> bool:
+        return os.path.basename(os.path.dirname(path)) == PREFETCH_DIR
+
+    def fill(self) -> None:
+        while not self._stopped:
+            with self._lock:
+                generation = self._generation
+                params = self._params
+                used = sum(os.path.getsize(path) for _, path, _ in self._queue if os.path.exists(path))
+                if params is None or len(self._queue) >= self.depth or (self._queue and used >= self.budget):
+                    return
+
+            pool, resolution, directory, library, mode, catalog, screens = params
+            try:
+                link, source = select_link(pool, resolution, pool.parser, mode, catalog=catalog)
+            except Exception as e:
+                print("PREFETCH FAILED: ", e)
+                return
+            if link is None:
+                return
+            with self._lock:
+                queued = any(item[0] == link for item in self._queue)
+            if queued:
+                continue  # staged under the same name, a second download would overwrite the first
+
+            size = output_size(resolution, screens)
+            path = library.lookup(link, size) if library is not None else None
+            if path is None:
+                staging = os.path.join(directory, PREFETCH_DIR)
+                os.makedirs(staging, exist_ok=True)
+                try:
+                    path = download_image(pool.parser, link, resolution, staging, source=source, screens=screens)
+                    if catalog is not None:
+                        catalog.index_stats([path])
+                except Exception as e:
+                    print("PREFETCH FAILED: ", link, e)
+                    return
+
+            with self._lock:
+                fresh = generation == self._generation
+                if fresh:
+                    self._queue.append((link, path, size))
+
+            if not fresh:
+                if self.is_staged(path):
+                    os.remove(path)
+                continue
+
+            print("Prefetched: ", path)
+
+    def stop(self) -> None:
+        self._stopped = True
+        self.invalidate()
+        self.thread.quit()
+        self.thread.wait(5000)
@@ -0,0 +1,95 @@
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal as Signal
+
+from scripts.link_pool import LinkPool
+from scripts.metrics import METRICS
+
+
+class QueryWorker(QObject):
+    results = Signal(int, object)
+    failed = Signal(int, str)
+
+    def __init__(self):
+        super().__init__()
+        self.latest = 0
+
+    def search(self, job: int, parser, query: dict, catalog=None):
+        if job != self.latest:
+            return  # superseded while waiting in the queue
+
+        try:
+            with METRICS.span("search"):
+                pool = LinkPool(parser, query, catalog=catalog)
+                pool.fill(cancelled=lambda: job != self.latest)
+        except Exception as e:
+            print("SEARCH FAILED: ", e)
+            self.failed.emit(job, str(e))
+            return
+
+        if job == self.latest:
+            self.results.emit(job, pool)
+
+
+class QueryService(QObject):
+    """Runs parser searches on a persistent background thread, newest query wins"""
+    search_requested = Signal(int, object, dict, object)
+    finished = Signal(object)
+    error = Signal(str)
+
+    def __init__(self, delay: int = 400):
+        super().__init__()
+        self._job = 0
+        self._done = 0
+        self._pending = None
+
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.dispatch)
+
+        self.thread = QThread()
+        self.worker = QueryWorker()
+        self.worker.moveToThread(self.thread)
+        self.search_requested.connect(self.worker.search)
+        self.worker.results.connect(self.on_results)
+        self.worker.failed.connect(self.on_failed)
+        self.thread.start()
+
+    def submit(self, parser, query: dict, debounce: bool = True, catalog=None) -> None:
+        """Schedules a search; any older search still queued or running is cancelled"""
+        self._job += 1
+        self.worker.latest = self._job
+        self._pending = (self._job, parser, dict(query), catalog)
+
+        if debounce:
+            self._timer.start()
+        else:
+            self._timer.stop()
+            self.dispatch()
+
+    def dispatch(self) -> None:
+        if self._pending is not None:
+            self.search_requested.emit(*self._pending)
+            self._pending = None
+
+    def busy(self) -> bool:
+        return self._job != self._done
+
+    def on_results(self, job: int, pool) -> None:
+        if job != self._job:
+            return  # a newer query has been submitted since
+
+        self._done = job
+        self.finished.emit(pool)
+
+    def on_failed(self, job: int, text: str) -> None:
+        if job != self._job:
+            return
+
+        self._done = job
+        self.error.emit(text)
+
+    def stop(self) -> None:
+        self._timer.stop()
+        self.worker.latest = -1
+        self.thread.quit()
+        self.thread.wait(5000)
@@ -0,0 +1,152 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from random import shuffle
+
+from scripts.metrics import METRICS
+from scripts.support import get_image_name
+
+PROBE_WORKERS = 6
+PROBE_BATCH = PROBE_WORKERS * 2
+MATCH_MODES = ["exact", "nearest"]
+
+
+def choose_resolution(available: list, resolution: list, mode: str = "exact"):
+    """Picks the source resolution to download for the target or None
+
+    "exact" needs the target itself. "nearest" falls back to the smallest resolution covering
+    the target, then to the largest one with the same aspect ratio; it is fitted locally.
+    """
+    if resolution in available:
+        return resolution
+    if mode != "nearest":
+        return None
+
+    width, height = resolution
+    covering = [i for i in available if i[0] >= width and i[1] >= height]
+    if covering:
+        return min(covering, key=lambda x: x[0] * x[1])
+
+    same_ratio = [i for i in available if abs(i[0] / i[1] - width / height) < 0.01]
+    if same_ratio:
+        return max(same_ratio, key=lambda x: x[0] * x[1])
+
+    return None
+
+
+def find_matching_link(images: list, resolution: list, get_available_res, workers: int = PROBE_WORKERS,
+                       unprobed: list = None, mode: str = "exact") -> tuple:
+    """Probes the links concurrently and returns the first (link, source resolution) that matches
+
+    Returns (None, None) without a match. Links whose probe was cancelled by an earlier
+    match are appended to unprobed. When every probe failed the last error is raised,
+    so callers can tell an unreachable source from a missing resolution.
+    """
+    links = list(images)
+    shuffle(links)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {executor.submit(get_available_res, link): link for link in links}
+
+    errors = []
+    try:
+        for future in as_completed(futures):
+            try:
+                available = future.result()
+            except Exception as e:
+                print("PROBE FAILED: ", futures[future], e)
+                errors.append(e)
+                continue
+
+            source = choose_resolution(available, resolution, mode)
+            if source is not None:
+                return futures[future], source
+    finally:
+        for future, link in futures.items():
+            if future.cancel() and unprobed is not None:
+                unprobed.append(link)
+        executor.shutdown(wait=False)
+
+    if links and len(errors) == len(links):
+        raise errors[-1]
+    return None, None
+
+
+def find_in_pool(pool, resolution: list, get_available_res, mode: str = "exact", cancelled=None) -> tuple:
+    """Probes the pool batch by batch until a link matches or the pass over the results is exhausted
+
+    cancelled() is checked between batches, a cancelled search returns (None, None).
+    """
+    with METRICS.span("probe"):
+        return probe_pool(pool, resolution, get_available_res, mode, cancelled)
+
+
+def select_link(pool, resolution: list, parser, mode: str = "exact", cancelled=None, catalog=None) -> tuple:
+    """Takes a never-shown match from the catalog or the parser's own index, otherwise probes the pool"""
+    get_available_res = parser.get_available_resolutions
+    if catalog is not None:
+        link, source = catalog.pick(parser.name, pool.query, resolution, mode)
+        if link is not None:
+            METRICS.incr("catalog_picks")
+            return link, source
+        get_available_res = catalog.probe(get_available_res)
+
+    link, source = parser.find_link(pool.query, resolution, mode)
+    if link is None:
+        link, source = find_in_pool(pool, resolution, get_available_res, mode, cancelled)
+    if link is not None and catalog is not None:
+        catalog.picked(link)
+    return link, source
+
+
+def probe_pool(pool, resolution: list, get_available_res, mode: str, cancelled=None) -> tuple:
+    while cancelled is None or not cancelled():
+        batch = pool.take(PROBE_BATCH)
+        if not batch:
+            return None, None
+
+        unprobed = []
+        try:
+            link, source = find_matching_link(batch, resolution, get_available_res, unprobed=unprobed, mode=mode)
+        except Exception:
+            pool.put_back(batch)  # the source is down, keep the links for when it is back
+            raise
+        pool.put_back(unprobed)
+
+        if link is not None:
+            return link, source
+
+    return None, None
+
+
+def download_image(parser, link: str, resolution: list, directory: str, library=None, source: list = None,
+                   catalog=None, progress=None, screens: list = None) -> str:
+    """Downloads the link at the source resolution, then has the imaging pool fit it to the target one
+
+    With several screens ([x, y, width, height] each) the one download is fitted to every screen
+    and the result covers the whole virtual desktop.
+    """
+    from scripts.imaging import output_size, postprocess
+
+    size = output_size(resolution, screens)
+    if library is not None:
+        path = library.lookup(link, size)
+        if path:
+            return path
+
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, get_image_name(link))
+    with METRICS.span("download"):
+        path = parser.get_image(link, source or resolution, stem, progress)
+
+    with METRICS.span("fit"):
+        path = postprocess(path, resolution, f"{stem}-{size[0]}x{size[1]}", screens)
+
+    if library is not None:
+        with METRICS.span("save"):
+            path = library.add(link, size, path)
+
+    if catalog is not None:
+        catalog.downloaded(link, size, path)
+        catalog.index_stats([path])
+
+    return path
@@ -1,34 +1,138 @@
-from PyQt6.QtCore import QObject, pyqtSignal as Signal
-from random import choice
+from PyQt6.QtCore import QObject, QThread, pyqtSignal as Signal
 
+from scripts.rotation import select_link, download_image
 
-class SearchingProcessor(QObject):
-    finished = Signal()
-    error_signal = Signal(str)
 
-    def __init__(self, start_func, show_error):
+class RotationWorker(QObject):
+    found = Signal(int, str)
+    failed = Signal(int, str)
+    unavailable = Signal(int, str)
+    progress = Signal(int, str)
+    downloading = Signal(int, object, object)
+
+    def __init__(self):
         super().__init__()
-        self.start = start_func
-        self.error_signal.connect(show_error)
+        self.latest = 0
 
-    def run(self, images, main_lay, main_page, load_page, resolution, get_available_res):
-        if not images:
+    def rotate(self, job: int, params: tuple):
+        if job != self.latest:
+            return  # superseded while waiting in the queue
+
+        pool, parser, resolution, directory, library, mode, catalog, screens = params
+        if pool is None or not (len(pool) or pool.has_pages()):
             print("IMAGES WERE NOT FOUND")
-            self.error_signal.emit("WARNING: images with these themes were not found")
-            main_lay.setCurrentWidget(main_page)
+            self.failed.emit(job, "WARNING: images with these themes were not found")
+            return
+
+        self.progress.emit(job, "probe")
+        try:
+            link, source = select_link(pool, resolution, parser, mode, lambda: job != self.latest, catalog)
+        except Exception as e:
+            print("SOURCE IS UNAVAILABLE: ", e)
+            self.unavailable.emit(job, str(e))
+            return
+
+        if job != self.latest:
+            if link is not None:
+                pool.put_back([link])
+            return
+
+        if link is None:
+            print("IMAGES WERE NOT FOUND")
+            self.failed.emit(job, "WARNING: images with this resolution were not found")
+            return
+
+        print("Image: ", link)
+        self.progress.emit(job, "download")
+        try:
+            path = download_image(parser, link, resolution, directory, library, source, catalog,
+                                  lambda done, total: self.downloading.emit(job, done, total), screens)
+        except Exception as e:
+            print("DOWNLOAD FAILED: ", link, e)
+            self.unavailable.emit(job, str(e))
+            return
+
+        if job == self.latest:
+            self.found.emit(job, path)
+
+
+class SearchingProcessor(QObject):
+    """Runs rotations one at a time on a persistent background thread, newest request wins
+
+    A request identical to the one in flight is dropped, a different one cancels it. Results
+    only come back through signals, so the worker never touches widgets.
+    """
+    rotate_requested = Signal(int, tuple)
+    finished = Signal(str)
+    error = Signal(str)
+    unavailable = Signal(str)
+    progress = Signal(str)
+    download_progress = Signal(object, object)
+
+    def __init__(self):
+        super().__init__()
+        self._job = 0
+        self._done = 0
+        self._params = None
+
+        self.thread = QThread()
+        self.worker = RotationWorker()
+        self.worker.moveToThread(self.thread)
+        self.rotate_requested.connect(self.worker.rotate)
+        self.worker.found.connect(self.on_found)
+        self.worker.failed.connect(self.on_failed)
+        self.worker.unavailable.connect(self.on_unavailable)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.downloading.connect(self.on_downloading)
+        self.thread.start()
+
+    def submit(self, pool, parser, resolution: list, directory: str, library=None, mode: str = "exact",
+               catalog=None, screens: list = None) -> None:
+        params = (pool, parser, list(resolution), directory, library, mode, catalog, screens)
+        if self.busy() and params == self._params:
             return
 
-        link = choice(images)
+        self._job += 1
+        self.worker.latest = self._job
+        self._params = params
+        self.rotate_requested.emit(self._job, params)
+
+    def cancel(self) -> None:
+        self._job += 1
+        self._done = self._job
+        self.worker.latest = self._job
+
+    def busy(self) -> bool:
+        return self._job != self._done
+
+    def complete(self, job: int) -> bool:
+        if job != self._job:
+            return False  # a newer rotation has been submitted since
+
+        self._done = job
+        return True
+
+    def on_found(self, job: int, path: str) -> None:
+        if self.complete(job):
+            self.finished.emit(path)
+
+    def on_failed(self, job: int, text: str) -> None:
+        if self.complete(job):
+            self.error.emit(text)
+
+    def on_unavailable(self, job: int, text: str) -> None:
+        if self.complete(job):
+            self.unavailable.emit(text)
+
+    def on_progress(self, job: int, stage: str) -> None:
+        if job == self._job:
+            self.progress.emit(stage)
 
-        count = 0
-        while not (resolution in get_available_res(link)):
-            link = images[count]
-            count += 1
+    def on_downloading(self, job: int, done: int, total) -> None:
+        if job == self._job:
+            self.download_progress.emit(done, total)
 
-            if count == len(images):
-                print("IMAGES WERE NOT FOUND")
-                self.error_signal.emit("WARNING: images with this resolution were not found")
-                main_lay.setCurrentWidget(main_page)
-                return
-        self.start(link)
-        self.finished.emit()
\ No newline at end of file
+    def stop(self) -> None:
+        self.worker.latest = -1
+        self.thread.quit()
+        self.thread.wait(5000)
@@ -0,0 +1,109 @@
+import atexit
+import json
+import os
+import threading
+
+SETTINGS_PATH = "./save.json"
+VERSION = 1
+
+
+def migrate_unversioned(saved: dict) -> dict:
+    # files written before versioning are plain {"dir", "interval", "resolution", ...} dicts
+    return saved
+
+
+MIGRATIONS = {0: migrate_unversioned}
+
+
+def default_settings(directory: str, resolution: list) -> dict:
+    """Defaults shared by the window and the headless daemon"""
+    return {"dir": directory, "interval": 60000, "resolution": list(resolution),
+            "prefetch_depth": 3, "prefetch_budget": 200 * 1024 * 1024,
+            "library_max_bytes": 2 * 1024 ** 3, "library_max_count": 500,
+            "match_mode": "exact", "brightness": "any", "colour": "", "local_folder": ""}
+
+
+class Settings:
+    """In-memory settings that are written behind a debounce, atomically and with a schema version"""
+    def __init__(self, defaults: dict, path: str = SETTINGS_PATH, delay: float = 1.0):
+        self.defaults = defaults
+        self.path = path
+        self.delay = delay
+        self._data = {}
+        self._timer = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+        atexit.register(self.flush)
+
+    def __getitem__(self, key: str):
+        return self._data[key]
+
+    def __setitem__(self, key: str, value) -> None:
+        with self._lock:
+            if self._data.get(key) == value:
+                return
+            self._data[key] = value
+            self._dirty = True
+        self.schedule()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def get(self, key: str, default=None):
+        return self._data.get(key, default)
+
+    def load(self) -> None:
+        saved = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    saved = json.load(f)
+            except (OSError, ValueError) as e:
+                print("SETTINGS ARE UNREADABLE: ", e)
+
+        if not isinstance(saved, dict):
+            saved = {}
+
+        version = saved.get("version", 0)
+        for step in range(version, VERSION):
+            saved = MIGRATIONS[step](saved)
+
+        self._data = self.validate(saved)
+        if self._data != saved:
+            self._dirty = True
+            self.flush()
+
+    def validate(self, saved: dict) -> dict:
+        data = dict(saved)
+        for key, default in self.defaults.items():
+            value = data.get(key)
+            if not isinstance(value, type(default)) or (isinstance(default, list) and len(value) != len(default)):
+                data[key] = default
+        data["version"] = VERSION
+        return data
+
+    def schedule(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            text = json.dumps(self._data)
+
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
@@ -1,21 +1,7 @@
 import sys
 import os
+import importlib
 from pathlib import Path
-import json
-
-
-def save_json(variant):
-    js = json.dumps(variant)
-    with open("./save.json", "w") as f:
-        f.write(js)
-
-
-def read_json():
-    with open("./save.json") as f:
-        f = f.read()
-        if f:
-            return json.loads(f)
-        return
 
 
 def resource_path(relative_path):
@@ -29,6 +15,23 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+def data_path(name) -> str:
+    """ Path of a per-user data file, outside the install and PyInstaller's temp folder """
+    base_path = os.environ.get("WALLPASTER_DATA_DIR")
+    if not base_path:
+        if sys.platform == "win32":
+            base_path = os.path.join(os.environ.get("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local"),
+                                     "Wallpaster")
+        elif sys.platform == "darwin":
+            base_path = str(Path.home() / "Library" / "Application Support" / "Wallpaster")
+        else:
+            base_path = os.path.join(os.environ.get("XDG_DATA_HOME") or str(Path.home() / ".local" / "share"),
+                                     "wallpaster")
+
+    os.makedirs(base_path, exist_ok=True)
+    return os.path.join(base_path, name)
+
+
 def get_first_file(directory, file_name) -> str:
     return str(next(Path(os.path.abspath(directory)).glob(file_name)))
 
@@ -45,3 +48,8 @@ def valid_link(link) -> str:
 
 def get_image_name(link) -> str:
     return link.split("/")[-2]
+
+
+def import_object(path):
+    module, name = path.rsplit(".", 1)
+    return getattr(importlib.import_module(module), name)
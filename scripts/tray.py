@@ -2,6 +2,8 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QIcon, QAction
 from PyQt6.QtWidgets import QSystemTrayIcon, QMenu
 
+from scripts.metrics import METRICS
+
 
 class AppTray(QSystemTrayIcon):
     def __init__(self, parent):
@@ -25,10 +27,18 @@ class AppTray(QSystemTrayIcon):
         tray_menu.setStyleSheet("color: black;")
         tray_menu.addAction(show_action)
         tray_menu.addAction(hide_action)
+        self.stats_menu = tray_menu.addMenu("Statistics")
+        self.stats_menu.aboutToShow.connect(self.update_stats)
         tray_menu.addAction(quit_action)
         self.setContextMenu(tray_menu)
         self.show()
 
+    def update_stats(self):
+        self.stats_menu.clear()
+        for line in METRICS.summary():
+            action = self.stats_menu.addAction(line)
+            action.setEnabled(False)
+
     def show_action(self):
         self.parent().show()
 
@@ -0,0 +1,52 @@
+import shlex
+import subprocess
+import sys
+from functools import partial
+
+SETTERS = ["windows", "noop", "command"]
+
+
+def set_windows_wallpaper(path: str, span: bool = False) -> int:
+    """Sets the desktop wallpaper; span stretches one image over all monitors instead of repeating it"""
+    import ctypes
+
+    if span:
+        import winreg
+
+        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Control Panel\Desktop", 0, winreg.KEY_SET_VALUE) as key:
+            winreg.SetValueEx(key, "WallpaperStyle", 0, winreg.REG_SZ, "22")
+            winreg.SetValueEx(key, "TileWallpaper", 0, winreg.REG_SZ, "0")
+
+    cs = ctypes.c_buffer(path.encode())
+    spi_setdeskwallpaper = 0x14
+    return ctypes.windll.user32.SystemParametersInfoA(spi_setdeskwallpaper, 0, cs, 0)
+
+
+def set_no_wallpaper(path: str) -> int:
+    print("Wallpaper: ", path)
+    return 1
+
+
+class CommandSetter:
+    """Runs a command with {path} replaced by the image, e.g. "feh --bg-fill {path}" """
+    def __init__(self, template: str):
+        self.template = template
+
+    def __call__(self, path: str) -> int:
+        args = [part.replace("{path}", path) for part in shlex.split(self.template)]
+        if "{path}" not in self.template:
+            args.append(path)
+        return int(subprocess.run(args).returncode == 0)
+
+
+def make_setter(name: str = None, command: str = None, span: bool = False):
+    """Returns the wallpaper setter callable for a name from SETTERS, by default the platform's own"""
+    if command:
+        return CommandSetter(command)
+    if name is None:
+        name = "windows" if sys.platform == "win32" else "noop"
+    if name == "windows":
+        return partial(set_windows_wallpaper, span=span)
+    if name == "noop":
+        return set_no_wallpaper
+    raise ValueError(f"unknown wallpaper setter: {name}, the command setter needs a command")
@@ -0,0 +1,672 @@
+import time
+
+STARTED = time.perf_counter()
+
+import json
+import sys
+import os
+import sqlite3
+from random import choice
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+from PyQt6.QtCore import QEvent, QSize, Qt, QTimer
+from PyQt6.QtGui import QIcon, QMovie, QPixmap
+from PyQt6.QtWidgets import (
+    QApplication, QMainWindow, QPushButton, QLabel,
+    QLineEdit, QVBoxLayout, QHBoxLayout, QWidget, QSpinBox,
+    QBoxLayout, QComboBox, QErrorMessage, QFileDialog, QStackedLayout, QCheckBox)
+
+from scripts.style import style_sheet
+from scripts.tray import AppTray
+from scripts.searching_processor import SearchingProcessor
+from scripts.prefetcher import Prefetcher
+from scripts.rotation import download_image
+from scripts import imaging
+from scripts.library import WallpaperLibrary
+from scripts.catalog import Catalog
+from scripts.query_service import QueryService
+from scripts.metrics import METRICS
+from scripts.settings import Settings, default_settings
+from scripts.wallpaper_setter import set_windows_wallpaper
+from scripts.imaging import output_size
+from scripts.image_stats import RULES, colour_value
+from scripts.support import import_object
+from parsers.registry import discover
+
+ROOT = Path(__file__).resolve().parent
+# parser modules pull in requests, so they are imported only once the window is painted
+PARSERS = discover()
+IMPORTED = time.perf_counter()
+
+
+def screen_rects() -> list:
+    """[x, y, width, height] of every screen in physical pixels"""
+    rects = []
+    for screen in QApplication.screens():
+        geometry, ratio = screen.geometry(), screen.devicePixelRatio()
+        rects.append([round(geometry.x() * ratio), round(geometry.y() * ratio),
+                      round(geometry.width() * ratio), round(geometry.height() * ratio)])
+    return rects
+
+
+class MainWindow(QMainWindow):
+    def __init__(self, screen_size: QSize):
+        super().__init__()
+
+        # window properties and variables
+        self.window_size = QSize(500, 300)
+        self.setWindowTitle("WallPaster")
+        self.setFixedSize(self.window_size)
+        self.setStyleSheet("background-color: #303030;")
+        self.setWindowIcon(QIcon("icons/icon.png"))
+
+        self.saved = Settings(default_settings(os.path.join(ROOT, "images"),
+                                               [screen_size.width(), screen_size.height()]))
+        self.query = {"q": "", "page": 1}
+        self.url = ""
+        self.parser = None
+        self.is_painted = False
+        self.pool = None
+        self.run_when_found = False
+        self.query_service = QueryService()
+        self.query_service.finished.connect(self.on_images_found)
+        self.query_service.error.connect(self.on_search_failed)
+        self.resolution = self.saved["resolution"]
+        self.screens = screen_rects()
+        self.directory = None
+        self.catalog = None
+        self.library = None
+        self.indexer = ThreadPoolExecutor(max_workers=1)  # one indexing job at a time, for the open directory
+        if not self.open_library(self.saved["dir"]):
+            self.open_library(os.path.join(ROOT, "images"))
+        self.loading_gif = QMovie("icons/loading.gif")
+        self.is_recently_loaded = False
+        # the label refresh only runs while the window is on screen and the slideshow is on,
+        # a tray-resident app wakes up once per slide
+        self.second_timer = QTimer()
+        self.second_timer.setTimerType(Qt.TimerType.CoarseTimer)
+        self.second_timer.setInterval(1000)
+        self.second_timer.timeout.connect(self.every_second_update)
+        self.slide_timer = QTimer()
+        self.slide_timer.setTimerType(Qt.TimerType.VeryCoarseTimer)
+        self.slide_timer.timeout.connect(self.run)
+        self.slide_timer.setInterval(self.saved["interval"])
+        self.prefetcher = Prefetcher(self.saved["prefetch_depth"], self.saved["prefetch_budget"])
+        self.tray_icon = AppTray(self)
+        self.tray_icon.add_tray()
+        self.current_image = ""
+
+        # window initialization
+        self.container = QWidget()
+        self.main_lay = QStackedLayout(self.container)
+        self.main_lay.setStackingMode(QStackedLayout.StackingMode.StackAll)
+        self.main_lay.currentChanged.connect(self.refresh_timers)
+
+        self.main_page = QWidget()
+        main_page_lay = QVBoxLayout()
+        main_page_lay.setAlignment(Qt.AlignmentFlag.AlignTop)
+        self.main_page.setLayout(main_page_lay)
+        self.main_lay.addWidget(self.main_page)
+
+        self.slide_label = QLabel("Slide show")
+        self.start_button = QPushButton(" Start")
+        self.stop_button = QPushButton(" Stop")
+        self.address = QComboBox()
+        self.themes = QLineEdit()
+        self.orientation = QComboBox()
+        self.width_number = QSpinBox()
+        self.height_number = QSpinBox()
+        self.nearest_box = QCheckBox("nearest")
+        self.brightness = QComboBox()
+        self.colour_edit = QLineEdit()
+        self.error_message = QErrorMessage(self.container)
+        self.searching = SearchingProcessor()
+        self.searching.finished.connect(self.on_rotated)
+        self.searching.error.connect(self.on_rotation_failed)
+        self.searching.unavailable.connect(self.set_offline_image)
+        self.searching.progress.connect(self.on_rotation_progress)
+        self.searching.download_progress.connect(self.on_download_progress)
+        app = QApplication.instance()
+        app.screenAdded.connect(self.on_screen_added)
+        app.screenRemoved.connect(self.on_screens_changed)
+        for screen in app.screens():
+            screen.geometryChanged.connect(self.on_screens_changed)
+        self.directory_button = QPushButton()
+        self.directory_edit = QLineEdit()
+        self.blackout = QWidget()
+        self.interval_label = QLabel("time interval (min): ")
+        self.interval_widget = QSpinBox()
+        self.directory_label = QLabel("Image directory:")
+        self.image_button = QPushButton("Set random wallpaper")
+        self.remain_label = QLabel("Remaining time: ")
+
+        self.header(main_page_lay)
+        site = self.site_section(main_page_lay)
+        self.directory_section(site["address_section"])
+        self.resolution_section(site["search_section"])
+        self.add_image_button(main_page_lay)
+        main_page_lay.addStretch()
+        self.start_section(main_page_lay)
+        self.loading_page(self.main_lay)
+
+        self.setCentralWidget(self.container)
+        self.themes.setFocus()
+
+    def paintEvent(self, event) -> None:
+        super().paintEvent(event)
+
+        if not self.is_painted:
+            self.is_painted = True
+            if not self.report_startup():
+                QTimer.singleShot(0, lambda: self.set_parser(self.address.currentText()))
+
+    def report_startup(self) -> bool:
+        """Prints startup timings when WALLPASTER_STARTUP_TIMING is set, returns True if the app should exit"""
+        mode = os.environ.get("WALLPASTER_STARTUP_TIMING")
+        if not mode:
+            return False
+
+        print(json.dumps({"import": IMPORTED - STARTED, "first_paint": time.perf_counter() - STARTED}), flush=True)
+        if mode == "exit":
+            QTimer.singleShot(0, self.complete_close)
+            return True
+        return False
+
+    def every_second_update(self):
+        if self.slide_timer.isActive():
+            self.remain_label.setText(f"Remaining time: {self.slide_timer.remainingTime() // 1000}s")
+        else:
+            self.remain_label.setText("Remaining time: ")
+
+    def refresh_timers(self, *args) -> None:
+        """Runs the label refresh and the loading animation only while they can be seen"""
+        visible = self.isVisible() and not self.isMinimized()
+
+        if visible and self.slide_timer.isActive():
+            if not self.second_timer.isActive():
+                self.every_second_update()
+                self.second_timer.start()
+        else:
+            self.second_timer.stop()
+
+        loading = visible and self.main_lay.currentWidget() is self.blackout
+        if loading and self.loading_gif.state() != QMovie.MovieState.Running:
+            self.loading_gif.start()
+        elif not loading and self.loading_gif.state() != QMovie.MovieState.NotRunning:
+            self.loading_gif.stop()
+
+    def showEvent(self, event) -> None:
+        super().showEvent(event)
+        self.refresh_timers()
+
+    def hideEvent(self, event) -> None:
+        super().hideEvent(event)
+        self.refresh_timers()
+
+    def changeEvent(self, event) -> None:
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.WindowStateChange:
+            self.refresh_timers()
+
+    def mousePressEvent(self, event) -> None:
+        self.setFocus()
+
+    def header(self, layout: QBoxLayout):
+        caption = QLabel()
+        caption.setText("WallPaster")
+        caption.setStyleSheet("color: white; font-size: 20px; margin: 10px 0 20px 0;")
+        caption.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        layout.addWidget(caption)
+
+    def add_image_button(self, layout: QBoxLayout):
+        image_lay = QHBoxLayout()
+        image_lay.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+
+        self.image_button.setStyleSheet("padding: 5px;")
+        self.image_button.pressed.connect(self.run)
+        image_lay.addWidget(self.image_button)
+
+        layout.addLayout(image_lay)
+
+    def site_section(self, layout: QBoxLayout):
+        self.address.setStyleSheet("border: 1px solid black;")
+        self.address.addItems(PARSERS)
+        self.address.currentTextChanged.connect(self.set_parser)
+
+        theme_lay = QHBoxLayout()
+
+        all_button = QPushButton("all")
+        all_button.pressed.connect(self.on_all_button)
+
+        self.themes.setPlaceholderText("Search [all images]")
+        self.themes.setStyleSheet("border: 1px solid black;")
+        self.themes.textEdited.connect(self.set_query)
+        self.themes.editingFinished.connect(self.set_themes)
+        self.themes.setFocus()
+
+        theme_lay.addWidget(self.themes)
+        theme_lay.addWidget(all_button)
+
+        orientation_lay = QHBoxLayout()
+
+        orientation_label = QLabel("orientation: ")
+        orientation_lay.addWidget(orientation_label)
+
+        self.orientation.addItems(["Landscape", "Portrait"])
+        self.orientation.currentTextChanged.connect(self.on_orientation_changed)
+        self.query["orientation"] = self.orientation.currentText().lower()
+        orientation_lay.addWidget(self.orientation)
+
+        self.brightness.addItems([rule.capitalize() for rule in RULES])
+        self.brightness.setToolTip("Prefer dark or light wallpapers, night means dark from 20:00 to 7:00")
+        self.brightness.setCurrentText(self.saved["brightness"].capitalize())
+        self.brightness.currentTextChanged.connect(self.on_brightness_changed)
+        orientation_lay.addWidget(self.brightness)
+
+        self.colour_edit.setPlaceholderText("#colour")
+        self.colour_edit.setToolTip("Prefer wallpapers whose dominant colours are close to this one, e.g. #204080")
+        self.colour_edit.setStyleSheet("border: 1px solid black;max-width: 60px;")
+        self.colour_edit.setText(self.saved["colour"])
+        self.colour_edit.editingFinished.connect(self.on_colour_changed)
+        orientation_lay.addWidget(self.colour_edit)
+
+        input_section = QHBoxLayout()
+        search_section = QVBoxLayout()
+        search_section.addLayout(theme_lay)
+        search_section.addLayout(orientation_lay)
+        address_section = QVBoxLayout()
+        address_section.addWidget(self.address)
+
+        search_section.setAlignment(Qt.AlignmentFlag.AlignTop)
+        address_section.setAlignment(Qt.AlignmentFlag.AlignTop)
+
+        input_section.addLayout(address_section)
+        input_section.addLayout(search_section)
+        input_section.setAlignment(Qt.AlignmentFlag.AlignTop)
+
+        layout.addLayout(input_section)
+
+        return {"input_section": input_section,
+                "search_section": search_section, "address_section": address_section}
+
+    def on_all_button(self):
+        self.query["q"] = ""
+        self.search(debounce=False)
+        self.themes.setText("")
+
+    def resolution_section(self, layout: QBoxLayout):
+        width_label = QLabel()
+        width_label.setText("width: ")
+
+        self.width_number.setMinimum(100)
+        self.width_number.setMaximum(10000)
+        self.width_number.setValue(self.resolution[0])
+        self.width_number.editingFinished.connect(self.on_resolution_changed)
+
+        width = QHBoxLayout()
+        width.addWidget(width_label)
+        width.addWidget(self.width_number)
+        width.setAlignment(Qt.AlignmentFlag.AlignLeft)
+
+        height_label = QLabel()
+        height_label.setText("height: ")
+
+        self.height_number.setMinimum(100)
+        self.height_number.setMaximum(10000)
+        self.height_number.setValue(self.resolution[1])
+        self.height_number.editingFinished.connect(self.on_resolution_changed)
+
+        height = QHBoxLayout()
+        height.addWidget(height_label)
+        height.addWidget(self.height_number)
+        height.setAlignment(Qt.AlignmentFlag.AlignLeft)
+
+        self.nearest_box.setToolTip("Use the closest larger resolution and crop it when the exact one is missing")
+        self.nearest_box.setChecked(self.saved["match_mode"] == "nearest")
+        self.nearest_box.toggled.connect(self.on_match_mode_changed)
+
+        size = QHBoxLayout()
+        size.addLayout(width)
+        size.addLayout(height)
+        size.addWidget(self.nearest_box)
+
+        layout.addLayout(size)
+
+    def directory_section(self, layout: QBoxLayout):
+        directory_layout = QHBoxLayout()
+        directory_layout.setAlignment(Qt.AlignmentFlag.AlignLeft)
+
+        self.directory_button.pressed.connect(self.choose_directory)
+        self.directory_button.setStyleSheet("fill: yellow;max-width: 20px;height: 20px;")
+        self.directory_button.setIcon(QIcon("icons/image_folder.svg"))
+
+        self.directory_edit.setText(self.directory)
+        self.directory_edit.editingFinished.connect(self.set_directory)
+
+        directory_layout.addWidget(self.directory_button)
+        directory_layout.addWidget(self.directory_edit)
+        layout.addWidget(self.directory_label)
+        layout.addLayout(directory_layout)
+
+    def start_section(self, layout: QBoxLayout):
+        label_lay = QVBoxLayout()
+
+        self.slide_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        self.slide_label.setStyleSheet("font-size: 16px")
+        label_lay.addWidget(self.slide_label)
+
+        self.interval_section(label_lay)
+
+        start_lay = QHBoxLayout()
+        start_lay.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        start_lay.setContentsMargins(0, 0, 0, 30)
+
+        self.start_button.setObjectName("play_button")
+        self.start_button.pressed.connect(self.on_timer_started)
+        self.start_button.setIcon(QIcon("icons/play_button.png"))
+
+        self.stop_button.setObjectName("stop_button")
+        self.stop_button.setEnabled(False)
+        self.stop_button.pressed.connect(self.on_timer_stopped)
+        stop_icon = QIcon()
+        stop_icon.addPixmap(QPixmap("icons/stop_button-active.png"), QIcon.Mode.Normal)
+        stop_icon.addPixmap(QPixmap("icons/stop_button-disabled.png"), QIcon.Mode.Disabled)
+        self.stop_button.setIcon(stop_icon)
+
+        start_lay.addWidget(self.start_button)
+        start_lay.addWidget(self.stop_button)
+
+        label_lay.addLayout(start_lay)
+        layout.addLayout(label_lay)
+
+    def loading_page(self, layout: QStackedLayout):
+        self.blackout.setStyleSheet("background-color: rgba(0,0,0,.3);")
+
+        self.loading_gif = QMovie("icons/loading.gif")
+
+        loading = QLabel()
+        loading.setMovie(self.loading_gif)
+        loading.move(self.window_size.width() // 2 - 16, self.window_size.height() // 2 - 16)
+        loading.setFixedSize(32, 32)
+        loading.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        loading.setParent(self.blackout)
+
+        self.download_label = QLabel(self.blackout)
+        self.download_label.setGeometry(0, self.window_size.height() // 2 + 24, self.window_size.width(), 20)
+        self.download_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        self.download_label.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+
+        layout.addWidget(self.blackout)
+
+    def interval_section(self, layout: QBoxLayout):
+        interval = QHBoxLayout()
+        interval.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+
+        self.interval_widget.setMinimum(1)
+        self.interval_widget.setMaximum(17000)
+        self.interval_widget.setValue(self.saved["interval"] // 60000)
+        self.interval_widget.editingFinished.connect(self.set_interval)
+
+        interval.addWidget(self.interval_label)
+        interval.addWidget(self.interval_widget)
+        interval.addWidget(self.remain_label)
+        layout.addLayout(interval)
+
+    def set_interval(self) -> None:
+        value = self.interval_widget.value()
+        ms = value * 60 * 1000
+        self.slide_timer.setInterval(ms)
+        self.saved["interval"] = ms
+        print(self.slide_timer.interval())
+
+    def show_error(self, text):
+        self.error_message.showMessage(text)
+
+    def complete_close(self):
+        self.saved.flush()
+        self.query_service.stop()
+        self.searching.stop()
+        self.prefetcher.stop()
+        self.catalog.close()  # a running indexing job stops after its current batch
+        self.indexer.shutdown(wait=False, cancel_futures=True)
+        imaging.shutdown()
+        if self.parser:
+            self.parser.client.close()
+        self.destroy()
+        self.tray_icon.deleteLater()
+        QApplication.instance().quit()
+
+    def closeEvent(self, event) -> None:
+        event.ignore()
+        self.hide()
+
+    def search(self, debounce: bool = True):
+        self.prefetcher.clear()  # wallpapers prepared for the previous query must not be shown
+        self.query_service.submit(self.parser, self.query, debounce, self.catalog)
+
+    def on_images_found(self, pool):
+        self.pool = pool
+        self.update_prefetch()
+
+        if self.run_when_found:
+            self.run_when_found = False
+            self.run()
+
+    def on_search_failed(self, text):
+        if self.run_when_found:
+            self.run_when_found = False
+            self.set_offline_image(text)
+            return
+
+        self.main_lay.setCurrentWidget(self.main_page)
+        self.show_error(f"WARNING: search failed: {text}")
+
+    def set_offline_image(self, text):
+        """Rotates through already downloaded wallpapers while the source cannot be reached"""
+        self.main_lay.setCurrentWidget(self.main_page)
+        path = self.catalog.offline(output_size(self.resolution, self.screens), self.saved["brightness"],
+                                    self.saved["colour"]) or self.library.random_file()
+        if path is None:
+            self.show_error(f"WARNING: source is unavailable: {text}")
+            return
+
+        print("Offline image: ", path)
+        METRICS.incr("offline_rotations")
+        self.set_wallpaper(path)
+
+    def update_prefetch(self):
+        if self.pool is None:
+            return
+        self.prefetcher.configure(self.pool, self.resolution, self.directory, self.library, self.saved["match_mode"],
+                                  self.catalog, self.screens)
+
+    def open_library(self, directory) -> bool:
+        """Switches to the library and catalog of a confirmed directory, keeps the current ones on errors
+
+        Nothing is created here, the directory appears with the first download.
+        """
+        try:
+            catalog = Catalog(directory)
+            library = WallpaperLibrary(directory, self.saved["library_max_bytes"], self.saved["library_max_count"])
+        except (OSError, sqlite3.Error) as e:
+            print("DIRECTORY IS UNUSABLE: ", directory, e)
+            text = f"WARNING: the directory cannot be used: {e}"
+            QTimer.singleShot(0, lambda: self.show_error(text))  # the window may still be under construction
+            return False
+
+        if self.catalog is not None:
+            self.catalog.close()
+        self.directory, self.catalog, self.library = directory, catalog, library
+        self.indexer.submit(self.index_library, catalog)
+        return True
+
+    @staticmethod
+    def index_library(catalog):
+        """Brings the statistics index of the directory up to date, only new or changed files are decoded"""
+        try:
+            print("Indexed images: ", catalog.refresh_stats())
+        except Exception as e:
+            print("INDEXING FAILED: ", e)
+
+    def run(self):
+        prefetched = self.prefetcher.pop(self.directory, self.library, self.catalog, self.saved["brightness"],
+                                         self.saved["colour"])
+        if prefetched:
+            print("Image: ", prefetched)
+            self.searching.cancel()
+            self.main_lay.setCurrentWidget(self.main_page)
+            self.set_wallpaper(prefetched)
+            self.prefetcher.request_fill()
+            return
+
+        if self.parser is None or self.query_service.busy():
+            self.run_when_found = True
+            self.main_lay.setCurrentWidget(self.blackout)
+            return
+
+        self.searching.submit(self.pool, self.parser, self.resolution, self.directory, self.library,
+                              self.saved["match_mode"], self.catalog, self.screens)
+        self.main_lay.setCurrentWidget(self.blackout)
+
+    def set_directory(self):
+        value = self.directory_edit.text().strip()
+        if not value or value == self.directory:
+            return
+
+        if self.open_library(value):
+            self.saved["dir"] = value
+            self.update_prefetch()
+        else:
+            self.directory_edit.setText(self.directory)
+        print(value)
+
+    def choose_directory(self):
+        dir = QFileDialog.getExistingDirectory(self, "Select Directory", r"D:\apps\WallPaster")
+
+        if dir and dir != self.directory and self.open_library(dir):
+            self.saved["dir"] = dir
+            self.update_prefetch()
+
+        self.directory_edit.setText(self.directory)
+        print(self.directory)
+
+    def on_resolution_changed(self):
+        self.resolution = [self.width_number.value(), self.height_number.value()]
+        self.saved["resolution"] = self.resolution
+        self.update_prefetch()
+        print(self.resolution)
+
+    def on_screen_added(self, screen):
+        screen.geometryChanged.connect(self.on_screens_changed)
+        self.on_screens_changed()
+
+    def on_screens_changed(self, *args):
+        self.screens = screen_rects()
+        self.update_prefetch()
+        print("Screens: ", self.screens)
+
+    def on_match_mode_changed(self, checked):
+        self.saved["match_mode"] = "nearest" if checked else "exact"
+        self.update_prefetch()
+        print(self.saved["match_mode"])
+
+    def on_brightness_changed(self, value):
+        self.saved["brightness"] = value.lower()
+        print(value)
+
+    def on_colour_changed(self):
+        try:
+            value = colour_value(self.colour_edit.text()) if self.colour_edit.text().strip() else ""
+        except ValueError:
+            value = ""
+        self.colour_edit.setText(value)
+        self.saved["colour"] = value
+        print(value)
+
+    def on_orientation_changed(self, value):
+        self.query["orientation"] = value.lower()
+        self.search()
+        print(value)
+
+    def set_parser(self, value):
+        if self.saved["local_folder"]:
+            from parsers.local_folder import LocalFolder
+            LocalFolder.root = self.saved["local_folder"]  # also the folder "All sources" searches
+        self.parser = import_object(PARSERS[value])()
+        self.url = self.parser.url
+        self.search(debounce=False)
+        print(self.url)
+
+    def on_timer_stopped(self):
+        self.stop_button.setEnabled(False)
+        self.slide_timer.stop()
+        self.refresh_timers()
+        self.every_second_update()
+        print(self.slide_timer.interval())
+
+    def on_timer_started(self):
+        self.run()
+        self.stop_button.setEnabled(True)
+        self.slide_timer.start()
+        self.refresh_timers()
+
+    def on_rotated(self, path):
+        self.set_wallpaper(path)
+        self.main_lay.setCurrentWidget(self.main_page)  # hide loading page
+        self.prefetcher.request_fill()
+
+    def on_rotation_failed(self, text):
+        self.main_lay.setCurrentWidget(self.main_page)
+        self.show_error(text)
+
+    def on_rotation_progress(self, stage):
+        print("Rotation: ", stage, self.query)
+        self.download_label.clear()
+
+    def on_download_progress(self, done, total):
+        if total:
+            self.download_label.setText(f"{done * 100 // total}%")
+        else:
+            self.download_label.setText(f"{done / 2 ** 20:.1f} MB")
+
+    def set_themes(self):
+        self.query["q"] = self.themes.text()
+        self.themes.clearFocus()
+        self.search(debounce=False)
+        print(self.query)
+
+    def set_query(self, value):
+        self.query["q"] = value
+        self.search()
+        print(self.query)
+
+    def download_image_by_link(self, link, source=None) -> str:
+        return download_image(self.parser, link, self.resolution, self.directory, self.library, source,
+                              screens=self.screens)
+
+    def download_image_by_bytes(self, byte: bytes, name: str) -> str:
+        with open(self.directory + name, "wb") as f:
+            f.write(byte)
+
+        return name
+
+    def set_wallpaper(self, path: str) -> int:
+        self.library.touch(path)
+        self.catalog.shown(path)
+        with METRICS.span("set_wallpaper"):
+            result = set_windows_wallpaper(path, span=len(self.screens) > 1)
+        METRICS.incr("rotations")
+        METRICS.export()
+
+        return result
+
+
+def run() -> None:
+    app = QApplication(sys.argv)
+    app.setStyleSheet(style_sheet)
+    screensize = app.primaryScreen().geometry().size()
+    window = MainWindow(screensize)
+    window.show()
+    app.exec()